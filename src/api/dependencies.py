@@ -1,10 +1,27 @@
-from fastapi import FastAPI, Request
+import math
+import time
+from typing import Iterable, Optional, Sequence
 
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.requests import HTTPConnection
+
+from src.config import settings
+from src.models.schemas import ChatRequest, ChatResponse
 from src.services.batch_handler import BatchHandler
+from src.services.cascade import CascadeRouter
+from src.services.length_predictor import LengthPrediction, OutputLengthPredictor
+from src.services.rate_limiter import (
+    RateLimitExceeded,
+    Reservation,
+    TokenBucketRateLimiter,
+)
+from src.services.traffic_recorder import TrafficRecorder
 from src.services.vllm_client import VLLMClient
 
+LENGTH_SAMPLE_SIZE = 32
+
 
-def get_vllm_client(request: Request) -> VLLMClient:
+async def get_vllm_client(request: Request) -> VLLMClient:
     """vLLM 클라이언트 의존성"""
     app: FastAPI = request.app
     if not hasattr(app.state, "vllm_client"):
@@ -12,9 +29,167 @@ def get_vllm_client(request: Request) -> VLLMClient:
     return app.state.vllm_client
 
 
-def get_batch_handler(request: Request) -> BatchHandler:
+async def get_batch_handler(request: HTTPConnection) -> BatchHandler:
     """배치 핸들러 의존성"""
     app: FastAPI = request.app
     if not hasattr(app.state, "batch_handler"):
         raise RuntimeError("Batch handler not initialized")
     return app.state.batch_handler
+
+
+async def get_cascade_router(request: Request) -> Optional[CascadeRouter]:
+    """cascade router 의존성 (비활성화 시 None)"""
+    return getattr(request.app.state, "cascade_router", None)
+
+
+async def get_rate_limiter(request: HTTPConnection) -> Optional[TokenBucketRateLimiter]:
+    """rate limiter 의존성 (비활성화 시 None)"""
+    return getattr(request.app.state, "rate_limiter", None)
+
+
+async def get_length_predictor(
+    request: HTTPConnection,
+) -> Optional[OutputLengthPredictor]:
+    """출력 길이 예측기 의존성 (비활성화 시 None)"""
+    return getattr(request.app.state, "length_predictor", None)
+
+
+async def get_api_key(request: HTTPConnection) -> str:
+    """
+    rate limit 키: 등록된 API 키(Bearer 토큰 → X-API-Key), 아니면 클라이언트 IP
+
+    gateway는 키를 발급/검증하지 않으므로, 등록되지 않은 키를 그대로 쓰면
+    헤더 값을 바꿀 때마다 새 버킷(burst)을 받아 제한을 우회할 수 있음
+
+    클라이언트 IP는 rate_limit_client_ip_header가 설정되면 그 헤더 값
+    (proxy가 덮어쓰는 헤더만 신뢰), 아니면 연결 peer 주소
+    """
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        api_key = authorization[7:].strip()
+    else:
+        api_key = request.headers.get("x-api-key", "")
+    if api_key and api_key in settings.rate_limit_api_keys:
+        return api_key
+    if settings.rate_limit_client_ip_header:
+        client_ip = request.headers.get(settings.rate_limit_client_ip_header, "")
+        if client_ip.strip():
+            return client_ip.strip()
+    return request.client.host if request.client else "anonymous"
+
+
+def check_models(requests: Iterable[ChatRequest]) -> None:
+    """요청한 모델이 서빙 중인지 확인, 아니면 400"""
+    available = settings.available_models
+    for request in requests:
+        if request.model is not None and request.model not in available:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown model: {request.model}"
+            )
+
+
+def length_sample(requests: Sequence[ChatRequest]) -> range:
+    """
+    출력 길이 예측/학습에 사용할 항목 index
+    (대용량 배치는 균등 간격 일부만 - 항목당 수 us라 이벤트 루프 점유 방지)
+    """
+    step = max(1, len(requests) // LENGTH_SAMPLE_SIZE)
+    return range(0, len(requests), step)
+
+
+def estimate_output_tokens(
+    predictor: Optional[OutputLengthPredictor],
+    api_key: str,
+    requests: Sequence[ChatRequest],
+) -> int:
+    """예약할 출력 토큰 수: 예측 tail 합 (예측기가 없으면 max_tokens 합)"""
+    if predictor is None:
+        return sum(r.max_tokens for r in requests)
+    sample = length_sample(requests)
+    tail = sum(predictor.predict(requests[i], api_key).tail for i in sample)
+    return math.ceil(tail * len(requests) / len(sample))
+
+
+def predict_output_length(
+    predictor: Optional[OutputLengthPredictor],
+    api_key: str,
+    request: ChatRequest,
+) -> Optional[LengthPrediction]:
+    """
+    단일 요청 출력 길이 예측 (예측기가 없으면 None)
+    - 토큰 예약, cascade 라우팅, 배치 구성에서 같은 예측을 공유
+    """
+    return predictor.predict(request, api_key) if predictor is not None else None
+
+
+def reserved_tokens(
+    request: ChatRequest, prediction: Optional[LengthPrediction]
+) -> int:
+    """예약할 출력 토큰 수: 예측 tail (예측이 없으면 max_tokens)"""
+    return prediction.tail if prediction is not None else request.max_tokens
+
+
+def observe_output_tokens(
+    predictor: Optional[OutputLengthPredictor],
+    api_key: str,
+    request: ChatRequest,
+    response: Optional[ChatResponse],
+) -> None:
+    """실제 completion_tokens를 예측기에 반영"""
+    if predictor is None or response is None:
+        return
+    predictor.observe(request, response.usage.get("completion_tokens", 0), api_key)
+
+
+def reserve_tokens(
+    limiter: Optional[TokenBucketRateLimiter], api_key: str, tokens: int
+) -> Optional[Reservation]:
+    """admission 시 토큰 예약, 부족하면 429"""
+    if limiter is None:
+        return None
+    try:
+        return limiter.reserve(api_key, tokens)
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers=e.headers())
+
+
+def settle_tokens(
+    limiter: Optional[TokenBucketRateLimiter],
+    reservation: Optional[Reservation],
+    responses: Iterable[ChatResponse] = (),
+) -> None:
+    """실제 completion_tokens로 예약분 정산 (실패 시 전액 환불)"""
+    if limiter is None or reservation is None:
+        return
+    used = sum(r.usage.get("completion_tokens", 0) for r in responses)
+    limiter.settle(reservation, used)
+
+
+async def get_traffic_recorder(request: HTTPConnection) -> Optional[TrafficRecorder]:
+    """트래픽 recorder 의존성 (캡처 비활성화 시 None)"""
+    return getattr(request.app.state, "traffic_recorder", None)
+
+
+def capture_traffic(
+    recorder: Optional[TrafficRecorder],
+    api_key: str,
+    endpoint: str,
+    request: ChatRequest,
+    arrival: float,
+    outcome: str,
+    response: Optional[ChatResponse] = None,
+    batch_id: Optional[str] = None,
+) -> None:
+    """요청 결과를 트래픽 로그에 기록 (arrival: time.time())"""
+    if recorder is None:
+        return
+    recorder.record(
+        api_key=api_key,
+        endpoint=endpoint,
+        request=request,
+        arrival=arrival,
+        latency_ms=(time.time() - arrival) * 1000,
+        outcome=outcome,
+        response=response,
+        batch_id=batch_id,
+    )
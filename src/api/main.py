@@ -1,36 +1,89 @@
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.api.middleware.metrics import MetricsMiddleware, get_metrics
-from src.api.routes import batch, chat, health
+from src.api.routes import batch, chat, chat_ws, health
 from src.config import settings
 from src.services.batch_handler import BatchHandler
+from src.services.cascade import create_cascade_router
+from src.services.cpu_offload import EventLoopLagMonitor, shutdown_executor
+from src.services.engine_metrics import create_engine_metrics_collector
+from src.services.length_predictor import create_length_predictor
+from src.services.rate_limiter import create_rate_limiter
+from src.services.traffic_recorder import create_traffic_recorder
 from src.services.vllm_client import VLLMClient
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+async def warmup_until_ready(app: FastAPI):
+    """warmup 성공 시까지 재시도 후 readiness 활성화"""
+    client: VLLMClient = app.state.vllm_client
+    start_time = time.perf_counter()
+
+    while not await client.warmup():
+        logger.warning(
+            f"⚠️ vLLM warmup failed, retrying in {settings.warmup_retry_interval_s}s"
+        )
+        await asyncio.sleep(settings.warmup_retry_interval_s)
+
+    app.state.warmup_ms = (time.perf_counter() - start_time) * 1000
+    app.state.ready = True
+    logger.info(f"✅ vLLM server warmed up ({app.state.warmup_ms:.2f}ms), ready")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Initializing vLLM client...")
 
-    app.state.vllm_client = VLLMClient()
-    app.state.batch_handler = BatchHandler(app.state.vllm_client)
-
-    # Health check
-    if await app.state.vllm_client.health_check():
-        logger.info("✅ vLLM server connected")
+    # 이벤트 루프 지연 모니터링
+    app.state.loop_monitor = EventLoopLagMonitor(settings.event_loop_lag_interval_ms)
+    app.state.loop_monitor.start()
+
+    # vLLM 엔진 부하 수집 (배치 throttling / backend 라우팅)
+    app.state.engine_metrics = create_engine_metrics_collector(settings.all_base_urls)
+    if app.state.engine_metrics is not None:
+        app.state.engine_metrics.start()
+
+    app.state.vllm_client = VLLMClient(engine_metrics=app.state.engine_metrics)
+    # 출력 길이 예측 (배치 구성, 토큰 예약)
+    app.state.length_predictor = create_length_predictor()
+    app.state.batch_handler = BatchHandler(
+        app.state.vllm_client,
+        engine_metrics=app.state.engine_metrics,
+        length_predictor=app.state.length_predictor,
+    )
+    app.state.cascade_router = create_cascade_router(app.state.length_predictor)
+    app.state.rate_limiter = create_rate_limiter()
+    app.state.traffic_recorder = create_traffic_recorder()
+    app.state.ready = False
+    app.state.warmup_ms = None
+
+    # Warmup은 백그라운드로 진행 (liveness는 즉시 응답, readiness는 warmup 이후)
+    warmup_task = None
+    if settings.warmup_enabled:
+        warmup_task = asyncio.create_task(warmup_until_ready(app))
     else:
-        logger.warning("⚠️ vLLM server not available")
+        app.state.ready = True
 
     yield
 
     # 종료
     logger.info("Shutting down...")
+    if warmup_task is not None:
+        warmup_task.cancel()
+    if app.state.traffic_recorder is not None:
+        app.state.traffic_recorder.close()
+    if app.state.engine_metrics is not None:
+        await app.state.engine_metrics.stop()
+    app.state.loop_monitor.stop()
+    shutdown_executor()
 
 
 app = FastAPI(
@@ -54,6 +107,7 @@ if settings.enable_metrics:
     app.add_middleware(MetricsMiddleware)
 
 app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
+app.include_router(chat_ws.router, prefix="/api/v1", tags=["chat"])
 app.include_router(batch.router, prefix="/api/v1", tags=["batch"])
 app.include_router(health.router, tags=["health"])
 
@@ -64,6 +118,7 @@ async def root():
         "name": "LLM Serving Platform",
         "version": "0.1.0",
         "vllm_model": settings.vllm_model,
+        "models": settings.available_models,
     }
 
 
@@ -6,7 +6,13 @@ import time
 from typing import Callable
 
 from fastapi import Request, Response
-from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
 from starlette.middleware.base import BaseHTTPMiddleware
 
 # ============================================
@@ -26,31 +32,122 @@ http_request_duration_seconds = Histogram(
 )
 
 # 배치 처리
-batch_requests_total = Counter("batch_requests_total", "Total batch requests processed")
+batch_requests_total = Counter(
+    "batch_requests_total", "Total batch requests processed", ["model"]
+)
 
 batch_size_total = Histogram(
-    "batch_size_total", "Batch size distribution", buckets=(1, 2, 4, 8, 16, 32, 64)
+    "batch_size_total",
+    "Batch size distribution",
+    ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64),
 )
 
 batch_duration_seconds = Histogram(
     "batch_duration_seconds",
     "Batch processing duration in seconds",
+    ["model"],
     buckets=(0.1, 0.5, 1.0, 2.0, 5.0, 10.0),
 )
 
+batch_coalesced_requests_total = Counter(
+    "batch_coalesced_requests_total",
+    "Requests served without their own upstream vLLM call",
+    ["model", "kind"],  # kind: singleflight, fanout
+)
+
+# Model cascade
+cascade_requests_total = Counter(
+    "cascade_requests_total",
+    "Requests by cascade route",
+    ["route"],  # fast, quality, escalated
+)
+
+cascade_latency_seconds = Histogram(
+    "cascade_latency_seconds",
+    "End-to-end latency by cascade route",
+    ["route"],
+    buckets=(0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+)
+
+cascade_gpu_seconds_saved = Gauge(
+    "cascade_gpu_seconds_saved",
+    "Estimated GPU seconds saved by routing to the fast model",
+)
+
+# Rate limiting
+rate_limit_requests_total = Counter(
+    "rate_limit_requests_total",
+    "Rate limiter admission decisions",
+    ["decision"],  # allowed, rejected
+)
+
 # vLLM
 vllm_requests_total = Counter(
     "vllm_requests_total",
     "Total vLLM requests",
-    ["status"],  # success, error
+    ["model", "status"],  # status: success, error
 )
 
 vllm_latency_seconds = Histogram(
     "vllm_latency_seconds",
     "vLLM request latency in seconds",
+    ["model"],
     buckets=(0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
 )
 
+# vLLM 엔진 부하 (backend /metrics 수집값 재노출, autoscaling 신호)
+vllm_engine_requests_running = Gauge(
+    "vllm_engine_requests_running", "Sequences running on vLLM engine", ["backend"]
+)
+
+vllm_engine_requests_waiting = Gauge(
+    "vllm_engine_requests_waiting", "Sequences waiting on vLLM engine", ["backend"]
+)
+
+vllm_engine_kv_cache_usage = Gauge(
+    "vllm_engine_kv_cache_usage", "vLLM KV cache usage (0-1)", ["backend"]
+)
+
+batch_throttled_total = Counter(
+    "batch_throttled_total", "Batch dispatches delayed by engine load"
+)
+
+# Event loop
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of scheduled event loop callbacks",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+cpu_offload_tasks_total = Counter(
+    "cpu_offload_tasks_total", "CPU-bound tasks run in worker threads", ["task"]
+)
+
+# 출력 길이 예측
+length_prediction_error_tokens = Histogram(
+    "length_prediction_error_tokens",
+    "Absolute error of predicted vs observed completion tokens",
+    buckets=(4, 16, 32, 64, 128, 256, 512, 1024),
+)
+
+length_predictions_total = Counter(
+    "length_predictions_total",
+    "Observed completions by whether they fit the predicted tail",
+    ["result"],  # within_tail, exceeded
+)
+
+# WebSocket 채팅
+websocket_connections = Gauge(
+    "websocket_connections", "Open WebSocket chat connections"
+)
+
+websocket_streams_total = Counter(
+    "websocket_streams_total",
+    "WebSocket chat streams by outcome",
+    ["outcome"],  # ok, cancelled, error, rejected
+)
+
 
 # ============================================
 # Middleware
@@ -92,18 +189,78 @@ class MetricsMiddleware(BaseHTTPMiddleware):
 # ============================================
 
 
-def record_batch_metrics(batch_size: int, duration_seconds: float):
+def record_batch_metrics(model: str, batch_size: int, duration_seconds: float):
     """배치 처리 메트릭 기록"""
-    batch_requests_total.inc()
-    batch_size_total.observe(batch_size)
-    batch_duration_seconds.observe(duration_seconds)
+    batch_requests_total.labels(model=model).inc()
+    batch_size_total.labels(model=model).observe(batch_size)
+    batch_duration_seconds.labels(model=model).observe(duration_seconds)
+
+
+def record_coalesced_requests(model: str, kind: str, count: int):
+    """병합 처리된 요청 수 기록"""
+    batch_coalesced_requests_total.labels(model=model, kind=kind).inc(count)
+
+
+def record_cascade(route: str, latency_seconds: float, gpu_seconds_saved: float):
+    """cascade 라우팅 결과 기록"""
+    cascade_requests_total.labels(route=route).inc()
+    cascade_latency_seconds.labels(route=route).observe(latency_seconds)
+    cascade_gpu_seconds_saved.inc(gpu_seconds_saved)
+
+
+def record_rate_limit(allowed: bool):
+    """rate limiter admission 결과 기록"""
+    decision = "allowed" if allowed else "rejected"
+    rate_limit_requests_total.labels(decision=decision).inc()
+
+
+def record_engine_load(
+    backend: str, running: float, waiting: float, kv_cache_usage: float
+):
+    """vLLM 엔진 부하 기록"""
+    vllm_engine_requests_running.labels(backend=backend).set(running)
+    vllm_engine_requests_waiting.labels(backend=backend).set(waiting)
+    vllm_engine_kv_cache_usage.labels(backend=backend).set(kv_cache_usage)
+
+
+def record_batch_throttled():
+    """엔진 부하로 배치 전송이 지연됨"""
+    batch_throttled_total.inc()
+
+
+def record_event_loop_lag(lag_seconds: float):
+    """이벤트 루프 지연 기록"""
+    event_loop_lag_seconds.observe(lag_seconds)
+
+
+def record_cpu_offload(task: str):
+    """worker 스레드로 오프로딩한 작업 기록"""
+    cpu_offload_tasks_total.labels(task=task).inc()
+
+
+def record_length_prediction(abs_error_tokens: float, within_tail: bool):
+    """출력 길이 예측 정확도 기록"""
+    length_prediction_error_tokens.observe(abs_error_tokens)
+    length_predictions_total.labels(
+        result="within_tail" if within_tail else "exceeded"
+    ).inc()
+
+
+def record_websocket_connection(delta: int):
+    """WebSocket 연결 수 변경 (+1 연결, -1 종료)"""
+    websocket_connections.inc(delta)
+
+
+def record_websocket_stream(outcome: str):
+    """WebSocket 스트림 종료 결과 기록"""
+    websocket_streams_total.labels(outcome=outcome).inc()
 
 
-def record_vllm_metrics(success: bool, latency_seconds: float):
+def record_vllm_metrics(model: str, success: bool, latency_seconds: float):
     """vLLM 요청 메트릭 기록"""
     status = "success" if success else "error"
-    vllm_requests_total.labels(status=status).inc()
-    vllm_latency_seconds.observe(latency_seconds)
+    vllm_requests_total.labels(model=model, status=status).inc()
+    vllm_latency_seconds.labels(model=model).observe(latency_seconds)
 
 
 # ============================================
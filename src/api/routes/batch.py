@@ -1,20 +1,108 @@
+import json
 import time
 import uuid
+from typing import Optional, Sequence
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 
-from src.api.dependencies import get_batch_handler, get_vllm_client
-from src.models.schemas import BatchChatRequest, BatchChatResponse
+from src.api.dependencies import (
+    capture_traffic,
+    check_models,
+    estimate_output_tokens,
+    get_api_key,
+    get_batch_handler,
+    get_length_predictor,
+    get_rate_limiter,
+    get_traffic_recorder,
+    get_vllm_client,
+    length_sample,
+    observe_output_tokens,
+    reserve_tokens,
+    settle_tokens,
+)
+from src.models.schemas import (
+    BatchChatRequest,
+    BatchChatResponse,
+    ChatRequest,
+    ChatResponse,
+)
 from src.services.batch_handler import BatchHandler
+from src.services.cpu_offload import offload
+from src.services.length_predictor import OutputLengthPredictor
+from src.services.rate_limiter import TokenBucketRateLimiter
+from src.services.traffic_recorder import TrafficRecorder
 from src.services.vllm_client import VLLMClient
 
 router = APIRouter()
 
 
-@router.post("/batch/chat", response_model=BatchChatResponse)
+def _validate_batch(body: bytes) -> BatchChatRequest:
+    """
+    배치 본문 검증 - 항목 단위로 나눠 검증
+    (한 번의 긴 C 호출이 GIL을 잡지 않도록 해 이벤트 루프가 중간중간 실행됨)
+    """
+    data = json.loads(body)
+    if not isinstance(data, dict) or not isinstance(data.get("requests"), list):
+        return BatchChatRequest.model_validate(data)
+    try:
+        requests = [ChatRequest.model_validate(item) for item in data["requests"]]
+    except ValidationError:
+        # 에러 위치(loc)를 배치 기준으로 보고하기 위해 전체 검증
+        return BatchChatRequest.model_validate(data)
+    return BatchChatRequest.model_validate({**data, "requests": requests})
+
+
+async def parse_batch_request(http_request: Request) -> BatchChatRequest:
+    """
+    배치 요청 본문 파싱
+    - 큰 본문은 worker 스레드에서 검증 (이벤트 루프 stall 방지)
+    - 오류 응답은 FastAPI 기본 본문 파싱과 동일 (JSON 오류 422, 디코딩 오류 400)
+    """
+    body = await http_request.body()
+    try:
+        return await offload("parse_batch", len(body), _validate_batch, body)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError(
+            [{"type": "json_invalid", "loc": ("body", e.pos), "msg": str(e)}]
+        )
+    except ValidationError as e:
+        raise RequestValidationError(
+            [
+                {**err, "loc": ("body", *err["loc"])}
+                for err in e.errors(include_url=False)
+            ]
+        )
+    except UnicodeDecodeError as e:
+        raise HTTPException(
+            status_code=400, detail="There was an error parsing the body"
+        ) from e
+
+
+@router.post(
+    "/batch/chat",
+    response_model=BatchChatResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": BatchChatRequest.model_json_schema(
+                        ref_template="#/components/schemas/{model}"
+                    )
+                }
+            },
+        }
+    },
+)
 async def batch_chat(
-    request: BatchChatRequest,
+    request: BatchChatRequest = Depends(parse_batch_request),
     client: VLLMClient = Depends(get_vllm_client),
+    limiter: Optional[TokenBucketRateLimiter] = Depends(get_rate_limiter),
+    predictor: Optional[OutputLengthPredictor] = Depends(get_length_predictor),
+    recorder: Optional[TrafficRecorder] = Depends(get_traffic_recorder),
+    api_key: str = Depends(get_api_key),
 ):
     """
     명시적 배치 처리
@@ -23,31 +111,85 @@ async def batch_chat(
     """
     if not request.requests:
         raise HTTPException(status_code=400, detail="Empty batch")
+    check_models(request.requests)
 
     batch_id = request.batch_id or str(uuid.uuid4())
+    arrival = time.time()
+    try:
+        reservation = reserve_tokens(
+            limiter,
+            api_key,
+            estimate_output_tokens(predictor, api_key, request.requests),
+        )
+    except HTTPException:
+        _capture_batch(recorder, api_key, request, batch_id, arrival, "rate_limited")
+        raise
+
     start_time = time.perf_counter()
 
     try:
         responses = await client.batch_chat_completion(request.requests)
+    except Exception as e:
+        settle_tokens(limiter, reservation)
+        _capture_batch(recorder, api_key, request, batch_id, arrival, "error")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        total_latency = (time.perf_counter() - start_time) * 1000
-        throughput = len(responses) / (total_latency / 1000)
+    settle_tokens(limiter, reservation, responses)
+    if predictor is not None:
+        by_id = {r.id: r for r in responses}
+        for i in length_sample(request.requests):
+            observe_output_tokens(
+                predictor, api_key, request.requests[i], by_id.get(f"batch_{i}")
+            )
+    _capture_batch(recorder, api_key, request, batch_id, arrival, "ok", responses)
 
-        return BatchChatResponse(
-            batch_id=batch_id,
-            responses=responses,
-            total_latency_ms=total_latency,
-            batch_size=len(responses),
-            throughput=throughput,
-        )
+    total_latency = (time.perf_counter() - start_time) * 1000
+    throughput = len(responses) / (total_latency / 1000)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = BatchChatResponse(
+        batch_id=batch_id,
+        responses=responses,
+        total_latency_ms=total_latency,
+        batch_size=len(responses),
+        throughput=throughput,
+    )
+
+    # 큰 응답은 worker 스레드에서 직렬화
+    size = sum(len(r.response) for r in responses)
+    content = await offload("serialize_batch", size, result.model_dump_json)
+    return Response(content=content, media_type="application/json")
 
 
 @router.get("/batch/stats")
 async def batch_stats(
     batch_handler: BatchHandler = Depends(get_batch_handler),
 ):
-    """배치 처리 통계"""
+    """배치 처리 통계 (전체 + 모델별)"""
     return batch_handler.get_stats()
+
+
+def _capture_batch(
+    recorder: Optional[TrafficRecorder],
+    api_key: str,
+    request: BatchChatRequest,
+    batch_id: str,
+    arrival: float,
+    outcome: str,
+    responses: Sequence[ChatResponse] = (),
+):
+    """배치 내 요청별로 트래픽 기록 (실패한 항목은 error)"""
+    if recorder is None:
+        return
+    by_id = {r.id: r for r in responses}
+    for i, req in enumerate(request.requests):
+        response = by_id.get(f"batch_{i}")
+        capture_traffic(
+            recorder,
+            api_key,
+            "/batch/chat",
+            req,
+            arrival,
+            outcome if response is not None or outcome != "ok" else "error",
+            response=response,
+            batch_id=batch_id,
+        )
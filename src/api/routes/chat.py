@@ -1,8 +1,31 @@
+import time
+from functools import partial
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
 
-from src.api.dependencies import get_batch_handler, get_vllm_client
+from src.api.dependencies import (
+    capture_traffic,
+    check_models,
+    get_api_key,
+    get_batch_handler,
+    get_cascade_router,
+    get_length_predictor,
+    get_rate_limiter,
+    get_traffic_recorder,
+    get_vllm_client,
+    observe_output_tokens,
+    predict_output_length,
+    reserve_tokens,
+    reserved_tokens,
+    settle_tokens,
+)
 from src.models.schemas import ChatRequest, ChatResponse
 from src.services.batch_handler import BatchHandler
+from src.services.cascade import CascadeRouter
+from src.services.length_predictor import OutputLengthPredictor
+from src.services.rate_limiter import TokenBucketRateLimiter
+from src.services.traffic_recorder import TrafficRecorder
 from src.services.vllm_client import VLLMClient
 
 router = APIRouter()
@@ -12,25 +35,91 @@ router = APIRouter()
 async def chat(
     request: ChatRequest,
     client: VLLMClient = Depends(get_vllm_client),
+    cascade: Optional[CascadeRouter] = Depends(get_cascade_router),
+    limiter: Optional[TokenBucketRateLimiter] = Depends(get_rate_limiter),
+    predictor: Optional[OutputLengthPredictor] = Depends(get_length_predictor),
+    recorder: Optional[TrafficRecorder] = Depends(get_traffic_recorder),
+    api_key: str = Depends(get_api_key),
 ):
     """단일 채팅 요청 (배치 미사용)"""
+    check_models([request])
+    arrival = time.time()
+    prediction = predict_output_length(predictor, api_key, request)
+    try:
+        reservation = reserve_tokens(
+            limiter, api_key, reserved_tokens(request, prediction)
+        )
+    except HTTPException:
+        capture_traffic(recorder, api_key, "/chat", request, arrival, "rate_limited")
+        raise
+
     try:
-        return await client.chat_completion(request)
+        if cascade is not None and request.model is None:
+            response = await cascade.run(
+                request, client.chat_completion, api_key, prediction
+            )
+        else:
+            response = await client.chat_completion(request)
     except Exception as e:
+        settle_tokens(limiter, reservation)
+        capture_traffic(recorder, api_key, "/chat", request, arrival, "error")
         raise HTTPException(status_code=500, detail=str(e))
 
+    settle_tokens(limiter, reservation, [response])
+    observe_output_tokens(predictor, api_key, request, response)
+    capture_traffic(recorder, api_key, "/chat", request, arrival, "ok", response)
+    return response
+
 
 @router.post("/chat/batch", response_model=ChatResponse)
 async def chat_with_batch(
     request: ChatRequest,
     batch_handler: BatchHandler = Depends(get_batch_handler),
+    cascade: Optional[CascadeRouter] = Depends(get_cascade_router),
+    limiter: Optional[TokenBucketRateLimiter] = Depends(get_rate_limiter),
+    predictor: Optional[OutputLengthPredictor] = Depends(get_length_predictor),
+    recorder: Optional[TrafficRecorder] = Depends(get_traffic_recorder),
+    api_key: str = Depends(get_api_key),
 ):
     """
     배치 처리를 사용하는 채팅
     - 여러 요청이 동시에 들어오면 자동으로 배치 처리
     - vLLM의 continuous batching 최대 활용
     """
+    check_models([request])
+    endpoint = "/chat/batch"
+    arrival = time.time()
+    prediction = predict_output_length(predictor, api_key, request)
+    try:
+        reservation = reserve_tokens(
+            limiter, api_key, reserved_tokens(request, prediction)
+        )
+    except HTTPException:
+        capture_traffic(recorder, api_key, endpoint, request, arrival, "rate_limited")
+        raise
+
     try:
-        return await batch_handler.add_request(request)
+        send = partial(batch_handler.add_request, tenant=api_key, prediction=prediction)
+        if cascade is not None and request.model is None:
+            response = await cascade.run(request, send, api_key, prediction)
+        else:
+            response = await send(request)
     except Exception as e:
+        settle_tokens(limiter, reservation)
+        capture_traffic(recorder, api_key, endpoint, request, arrival, "error")
         raise HTTPException(status_code=500, detail=str(e))
+
+    settle_tokens(limiter, reservation, [response])
+    observe_output_tokens(predictor, api_key, request, response)
+    capture_traffic(recorder, api_key, endpoint, request, arrival, "ok", response)
+    return response
+
+
+@router.get("/chat/cascade/stats")
+async def cascade_stats(
+    cascade: Optional[CascadeRouter] = Depends(get_cascade_router),
+):
+    """모델 cascade 통계 (route별 요청 수, latency, 절약 GPU 시간)"""
+    if cascade is None:
+        return {"enabled": False}
+    return {"enabled": True, **cascade.get_stats()}
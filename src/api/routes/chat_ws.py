@@ -0,0 +1,290 @@
+"""
+WebSocket 채팅 - 연결 하나에서 여러 스트림을 다중화
+
+멀티턴 대화마다 HTTP 요청을 새로 열지 않고 연결 하나를 유지하며,
+스트림마다 id를 붙여 여러 생성을 동시에 주고받음
+
+Client → Server
+    {"type": "chat", "id": "s1", "request": {...ChatRequest}}
+    {"type": "cancel", "id": "s1"}
+
+Server → Client
+    {"type": "delta", "id": "s1", "content": "..."}
+    {"type": "done", "id": "s1", "finish_reason": "stop", "usage": {...},
+     "latency_ms": 123.4}
+    {"type": "cancelled", "id": "s1"}
+    {"type": "error", "id": "s1", "status": 429, "detail": "..."}
+"""
+
+import asyncio
+import json
+import time
+from contextlib import aclosing
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from src.api.dependencies import (
+    capture_traffic,
+    check_models,
+    estimate_output_tokens,
+    get_api_key,
+    get_batch_handler,
+    get_length_predictor,
+    get_rate_limiter,
+    get_traffic_recorder,
+    observe_output_tokens,
+    reserve_tokens,
+    settle_tokens,
+)
+from src.api.middleware.metrics import (
+    record_websocket_connection,
+    record_websocket_stream,
+)
+from src.config import settings
+from src.models.schemas import ChatRequest, ChatResponse
+from src.services.batch_handler import BatchHandler
+from src.services.length_predictor import OutputLengthPredictor
+from src.services.rate_limiter import Reservation, TokenBucketRateLimiter
+from src.services.traffic_recorder import TrafficRecorder
+
+router = APIRouter()
+
+ENDPOINT = "/chat/ws"
+
+
+class ChatConnection:
+    """
+    WebSocket 연결 하나의 스트림 관리
+
+    flow control
+    - 전송 메시지는 크기 제한된 큐(websocket_send_queue_size)를 거쳐 전송
+    - 클라이언트가 느리면 큐가 차고 스트림들이 다음 조각을 읽지 않으므로
+      upstream(vLLM) 연결까지 backpressure가 전달됨 (메모리 무한 증가 없음)
+    - 동시 스트림 수는 websocket_max_streams로 제한
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        batch_handler: BatchHandler,
+        limiter: Optional[TokenBucketRateLimiter],
+        recorder: Optional[TrafficRecorder],
+        api_key: str,
+        predictor: Optional[OutputLengthPredictor] = None,
+    ):
+        self.websocket = websocket
+        self.batch_handler = batch_handler
+        self.limiter = limiter
+        self.recorder = recorder
+        self.api_key = api_key
+        self.predictor = predictor
+        self.outbox: asyncio.Queue = asyncio.Queue(
+            maxsize=settings.websocket_send_queue_size
+        )
+        self.streams: Dict[str, asyncio.Task] = {}
+
+    async def run(self) -> None:
+        writer = asyncio.create_task(self._write_loop())
+        try:
+            await self._read_loop()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # 연결 종료 시 진행 중인 생성 모두 중단
+            streams = list(self.streams.values())
+            for task in streams:
+                task.cancel()
+            await asyncio.gather(*streams, return_exceptions=True)
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+
+    async def _write_loop(self) -> None:
+        while True:
+            message = await self.outbox.get()
+            await self.websocket.send_json(message)
+
+    async def _send(self, message: Dict) -> None:
+        await self.outbox.put(message)
+
+    async def _error(self, stream_id: Optional[str], status: int, detail) -> None:
+        await self._send(
+            {"type": "error", "id": stream_id, "status": status, "detail": detail}
+        )
+
+    async def _read_loop(self) -> None:
+        while True:
+            text = await self.websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except json.JSONDecodeError as e:
+                await self._error(None, 400, f"Invalid JSON: {e}")
+                continue
+            if not isinstance(message, dict):
+                await self._error(None, 400, "Message must be a JSON object")
+                continue
+
+            stream_id = message.get("id")
+            kind = message.get("type")
+            if not isinstance(stream_id, str) or not stream_id:
+                await self._error(None, 400, "Missing stream id")
+            elif kind == "chat":
+                await self._start(stream_id, message.get("request"))
+            elif kind == "cancel":
+                await self._cancel(stream_id)
+            else:
+                await self._error(stream_id, 400, f"Unknown message type: {kind}")
+
+    async def _start(self, stream_id: str, payload) -> None:
+        """스트림 시작 (검증/admission 실패는 즉시 error)"""
+        try:
+            request = ChatRequest.model_validate(payload)
+        except ValidationError as e:
+            await self._error(stream_id, 422, json.loads(e.json(include_url=False)))
+            return
+
+        if stream_id in self.streams:
+            await self._error(stream_id, 409, "Stream id already in use")
+            return
+        if len(self.streams) >= settings.websocket_max_streams:
+            record_websocket_stream("rejected")
+            await self._error(stream_id, 429, "Too many concurrent streams")
+            return
+
+        arrival = time.time()
+        try:
+            check_models([request])
+            reservation = reserve_tokens(
+                self.limiter,
+                self.api_key,
+                estimate_output_tokens(self.predictor, self.api_key, [request]),
+            )
+        except HTTPException as e:
+            record_websocket_stream("rejected")
+            if e.status_code == 429:
+                capture_traffic(
+                    self.recorder,
+                    self.api_key,
+                    ENDPOINT,
+                    request,
+                    arrival,
+                    "rate_limited",
+                )
+            await self._error(stream_id, e.status_code, e.detail)
+            return
+
+        self.streams[stream_id] = asyncio.create_task(
+            self._run_stream(stream_id, request, reservation, arrival)
+        )
+
+    async def _cancel(self, stream_id: str) -> None:
+        """생성 중단 - upstream 연결을 닫아 vLLM에서도 abort"""
+        task = self.streams.get(stream_id)
+        if task is None:
+            await self._error(stream_id, 404, "Unknown stream id")
+            return
+        task.cancel()
+        await asyncio.wait([task])
+        await self._send({"type": "cancelled", "id": stream_id})
+
+    async def _run_stream(
+        self,
+        stream_id: str,
+        request: ChatRequest,
+        reservation: Optional[Reservation],
+        arrival: float,
+    ) -> None:
+        start_time = time.perf_counter()
+        chunks: List[str] = []
+        response: Optional[ChatResponse] = None
+        outcome = "error"
+
+        try:
+            final = None
+            async with aclosing(self.batch_handler.stream_request(request)) as stream:
+                async for delta in stream:
+                    if delta.usage is not None:
+                        final = delta
+                        continue
+                    chunks.append(delta.content)
+                    await self._send(
+                        {"type": "delta", "id": stream_id, "content": delta.content}
+                    )
+
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            response = self._response(stream_id, request, chunks, latency_ms)
+            if final is not None:
+                response.usage = final.usage or response.usage
+                response.finish_reason = final.finish_reason
+            outcome = "ok"
+            observe_output_tokens(self.predictor, self.api_key, request, response)
+            await self._send(
+                {
+                    "type": "done",
+                    "id": stream_id,
+                    "finish_reason": response.finish_reason,
+                    "usage": response.usage,
+                    "latency_ms": latency_ms,
+                }
+            )
+
+        except asyncio.CancelledError:
+            # 중단 전까지 생성된 조각 수(≈토큰 수)만큼만 과금
+            outcome = "cancelled"
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            response = self._response(stream_id, request, chunks, latency_ms)
+            raise
+
+        except Exception as e:
+            await self._error(stream_id, 500, str(e))
+
+        finally:
+            self.streams.pop(stream_id, None)
+            settle_tokens(self.limiter, reservation, [response] if response else [])
+            capture_traffic(
+                self.recorder,
+                self.api_key,
+                ENDPOINT,
+                request,
+                arrival,
+                outcome,
+                response,
+            )
+            record_websocket_stream(outcome)
+
+    @staticmethod
+    def _response(
+        stream_id: str, request: ChatRequest, chunks: List[str], latency_ms: float
+    ) -> ChatResponse:
+        return ChatResponse(
+            id=stream_id,
+            response="".join(chunks),
+            model=request.model or settings.vllm_model,
+            usage={"completion_tokens": len(chunks)},
+            latency_ms=latency_ms,
+        )
+
+
+@router.websocket("/chat/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    batch_handler: BatchHandler = Depends(get_batch_handler),
+    limiter: Optional[TokenBucketRateLimiter] = Depends(get_rate_limiter),
+    recorder: Optional[TrafficRecorder] = Depends(get_traffic_recorder),
+    predictor: Optional[OutputLengthPredictor] = Depends(get_length_predictor),
+    api_key: str = Depends(get_api_key),
+):
+    """
+    WebSocket 채팅 (스트림 다중화)
+    - 스트림은 BatchHandler의 모델별 스케줄링(동시성 상한, 엔진 throttling)을 따름
+    - model 미지정 시 기본 모델 사용 (cascade는 완성된 응답이 필요하므로 미적용)
+    """
+    await websocket.accept()
+    record_websocket_connection(1)
+    try:
+        await ChatConnection(
+            websocket, batch_handler, limiter, recorder, api_key, predictor
+        ).run()
+    finally:
+        record_websocket_connection(-1)
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 
 from src.api.dependencies import get_vllm_client
 from src.config import settings
-from src.models.schemas import HealthResponse
+from src.models.schemas import HealthResponse, ReadinessResponse
 from src.services.vllm_client import VLLMClient
 
 router = APIRouter()
@@ -18,3 +18,12 @@ async def health(client: VLLMClient = Depends(get_vllm_client)):
         vllm_connected=vllm_connected,
         model=settings.vllm_model,
     )
+
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def ready(request: Request):
+    """트래픽 수신 가능 여부 (warmup 완료 후 200)"""
+    if not getattr(request.app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Warmup not completed")
+
+    return ReadinessResponse(status="ready", warmup_ms=request.app.state.warmup_ms)
@@ -1,6 +1,18 @@
+from typing import Dict, List, Optional, Set
+
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class ModelBatchPolicy(BaseModel):
+    """모델별 배치 정책 (미지정 항목은 전역 batch_* 설정 사용)"""
+
+    max_batch_size: Optional[int] = None
+    timeout_ms: Optional[int] = None
+    max_concurrency: Optional[int] = None  # 동시 upstream 요청 상한
+    token_budget: Optional[int] = None  # 배치당 예상 출력 토큰(tail) 합 상한
+
+
 class Settings(BaseSettings):
     """Application settings with environment variable support"""
 
@@ -12,23 +24,148 @@ class Settings(BaseSettings):
     vllm_base_url: str = "http://localhost:8000"
     vllm_api_key: str = ""
     vllm_model: str = "microsoft/Phi-3-mini-4k-instruct"
+    vllm_extra_base_urls: str = ""  # 콤마 구분 추가 backend (부하 기반 라우팅)
+    served_models: str = ""  # 콤마 구분 추가 모델 / LoRA adapter 이름
+
+    # vLLM 엔진 부하 수집 (/metrics) 및 배치 전송 throttling
+    engine_metrics_enabled: bool = True
+    engine_metrics_interval_s: float = 1.0
+    engine_metrics_stale_s: float = 5.0
+    engine_throttle_waiting: int = 32  # 대기 시퀀스가 이 이상이면 전송 보류
+    engine_throttle_kv_usage: float = 0.95  # KV cache 사용률이 이 이상이면 전송 보류
+    engine_throttle_backoff_ms: int = 50
+    engine_throttle_max_wait_ms: int = 2000
 
     # 배치 처리 설정
     batch_max_size: int = 32  # vLLM의 continuous batching 활용
     batch_timeout_ms: int = 100  # 100ms 대기
+    batch_coalesce_enabled: bool = True  # 동일 요청 병합 (singleflight / n fan-out)
+    batch_stats_bucket_seconds: float = 10.0  # 슬라이딩 윈도우 통계 시간 구간 크기 (초)
+    batch_max_concurrency: int = 0  # 모델별 동시 upstream 요청 상한 (0: 무제한)
+    batch_token_budget: int = 0  # 배치당 예상 출력 토큰(tail) 합 상한 (0: 무제한)
+    batch_max_reorder_delay_ms: int = 500  # 이보다 오래 기다린 요청은 길이 무관 우선
+    # 모델별 정책 (JSON), 예: {"phi-3-lora-sql": {"max_batch_size": 8}}
+    batch_model_policies: Dict[str, ModelBatchPolicy] = {}
 
     # API 서버 설정
     api_host: str = "0.0.0.0"
     api_port: int = 8080
     api_workers: int = 4
 
+    # 출력 길이 예측 (관측한 completion_tokens로 학습, 배치 구성과 토큰 예약에 사용)
+    length_predictor_enabled: bool = True
+    length_predictor_quantile: float = 0.9  # tail 예측 분위수
+    length_predictor_min_samples: int = 20  # 이보다 적으면 상위 feature로 backoff
+    length_predictor_max_keys: int = 10000
+
+    # Rate limiting (API 키별 생성 토큰 기준 토큰 버킷, opt-in)
+    # proxy(Istio ingress, Knative queue-proxy) 뒤에서는 연결 주소가 proxy이므로
+    # rate_limit_api_keys 또는 rate_limit_client_ip_header를 설정한 뒤 활성화
+    rate_limit_enabled: bool = False
+    rate_limit_tokens_per_second: float = 1000.0
+    rate_limit_burst_tokens: int = 16384
+    rate_limit_shards: int = 16
+    # 등록된 API 키 (Bearer / X-API-Key), 이외의 키는 클라이언트 IP 기준으로 제한
+    rate_limit_api_keys: Set[str] = set()
+    # IP fallback에 사용할 헤더 (비우면 연결 peer 주소)
+    # 예: x-envoy-external-address (Istio ingress가 매 요청 덮어씀)
+    # 클라이언트가 값을 넣을 수 있는 헤더(가공되지 않은 X-Forwarded-For 등)는 지정 금지
+    rate_limit_client_ip_header: str = ""
+
+    # 트래픽 캡처 (replay/capacity planning용, 경로 설정 시 활성화)
+    traffic_capture_path: str = ""
+    traffic_capture_prompt_mode: str = "hash"  # raw, hash, redact
+    # tenant/프롬프트 digest용 HMAC 키 (미설정 시 프로세스마다 임의 값)
+    traffic_capture_salt: str = ""
+
+    # Model cascade (쉬운 요청은 작은 fast 모델로, 나머지는 기본 quality 모델로)
+    cascade_enabled: bool = False
+    cascade_fast_model: str = ""
+    cascade_fast_base_urls: str = ""  # 콤마 구분, 비우면 기본 backend 사용
+    # 예상 출력 길이(length predictor tail, 없으면 max_tokens)가 이보다 크면 quality
+    cascade_fast_max_tokens: int = 256
+    cascade_fast_prompt_chars: int = 2000  # 프롬프트가 이보다 길면 quality
+    # 단어 단위 매칭 (한글은 조사 허용)
+    cascade_quality_keywords: str = "code,analyze,prove,step by step,코드,분석,증명"
+    cascade_escalation_threshold: float = 0.3  # 유사 프롬프트 escalation 비율 상한
+    cascade_history_size: int = 10000
+
+    # WebSocket 채팅 (연결 하나에 여러 스트림 다중화)
+    websocket_max_streams: int = 16  # 연결당 동시 스트림 상한
+    websocket_send_queue_size: int = 256  # 연결당 전송 대기 메시지 상한 (flow control)
+
     # 모델 설정
     max_tokens: int = 512
     temperature: float = 0.7
 
+    # 시작 시 warmup (완료 후 /ready 활성화)
+    warmup_enabled: bool = True
+    warmup_prompt: str = "Hello"
+    warmup_max_tokens: int = 1
+    warmup_concurrency: int = 4  # 커넥션 풀 예열용 동시 요청 수
+    warmup_retry_interval_s: float = 5.0
+
+    # CPU 작업 오프로딩 (대용량 배치 파싱/직렬화를 worker 스레드로)
+    offload_min_bytes: int = 256 * 1024
+    offload_workers: int = 2
+
     # 모니터링
     enable_metrics: bool = True
     metrics_port: int = 9090
+    event_loop_lag_interval_ms: int = 100
+
+    @property
+    def vllm_base_urls(self) -> List[str]:
+        """라우팅 대상 vLLM backend 목록"""
+        extra = [url.strip() for url in self.vllm_extra_base_urls.split(",")]
+        return [self.vllm_base_url] + [url for url in extra if url]
+
+    @property
+    def available_models(self) -> List[str]:
+        """요청 가능한 모델 목록 (첫 번째가 기본 모델)"""
+        extra = [model.strip() for model in self.served_models.split(",")]
+        if self.cascade_enabled and self.cascade_fast_model:
+            extra.append(self.cascade_fast_model)
+        models = [self.vllm_model]
+        for model in extra:
+            if model and model not in models:
+                models.append(model)
+        return models
+
+    def model_base_urls(self, model: str) -> List[str]:
+        """모델을 서빙하는 backend 목록"""
+        if self.cascade_enabled and model == self.cascade_fast_model:
+            urls = [url.strip() for url in self.cascade_fast_base_urls.split(",")]
+            urls = [url for url in urls if url]
+            if urls:
+                return urls
+        return self.vllm_base_urls
+
+    @property
+    def all_base_urls(self) -> List[str]:
+        """모든 모델의 backend 목록 (중복 제거)"""
+        urls = []
+        for model in self.available_models:
+            for url in self.model_base_urls(model):
+                if url not in urls:
+                    urls.append(url)
+        return urls
+
+    def batch_policy(self, model: str) -> ModelBatchPolicy:
+        """전역 설정과 병합된 모델별 배치 정책"""
+        policy = self.batch_model_policies.get(model, ModelBatchPolicy())
+        return ModelBatchPolicy(
+            max_batch_size=policy.max_batch_size or self.batch_max_size,
+            timeout_ms=(
+                policy.timeout_ms
+                if policy.timeout_ms is not None
+                else self.batch_timeout_ms
+            ),
+            max_concurrency=policy.max_concurrency
+            or self.batch_max_concurrency
+            or None,
+            token_budget=policy.token_budget or self.batch_token_budget or None,
+        )
 
 
 settings = Settings()
@@ -18,9 +18,11 @@ class Message(BaseModel):
 
 class ChatRequest(BaseModel):
     messages: List[Message]
+    model: Optional[str] = None  # 미지정 시 기본 모델 (LoRA adapter 이름 가능)
     max_tokens: int = Field(default=512, ge=1, le=2048)
     temperature: float = Field(default=0.7, ge=0.0, le=2.0)
     stream: bool = False
+    escalate: bool = False  # cascade: fast 모델 응답이 잘리면 quality 모델로 재시도
 
 
 class ChatResponse(BaseModel):
@@ -29,9 +31,18 @@ class ChatResponse(BaseModel):
     model: str
     usage: Dict[str, int]
     latency_ms: float
+    finish_reason: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class ChatDelta(BaseModel):
+    """스트리밍 응답 조각 (마지막 조각에 finish_reason, usage)"""
+
+    content: str = ""
+    finish_reason: Optional[str] = None
+    usage: Optional[Dict[str, int]] = None
+
+
 class BatchChatRequest(BaseModel):
     """배치 처리를 위한 여러 채팅 요청"""
 
@@ -51,3 +62,8 @@ class HealthResponse(BaseModel):
     status: str
     vllm_connected: bool
     model: str
+
+
+class ReadinessResponse(BaseModel):
+    status: str
+    warmup_ms: Optional[float] = None
@@ -2,15 +2,73 @@ import asyncio
 import logging
 import time
 from collections import deque
-from typing import Dict
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from src.api.middleware.metrics import record_batch_metrics
-from src.config import settings
-from src.models.schemas import ChatRequest, ChatResponse
+from src.api.middleware.metrics import (
+    record_batch_metrics,
+    record_batch_throttled,
+    record_coalesced_requests,
+)
+from src.config import ModelBatchPolicy, settings
+from src.models.schemas import ChatDelta, ChatRequest, ChatResponse
+from src.services.engine_metrics import EngineMetricsCollector
+from src.services.length_predictor import LengthPrediction, OutputLengthPredictor
 from src.services.vllm_client import VLLMClient
+from src.services.window_stats import WindowedStats
 
 logger = logging.getLogger(__name__)
 
+# (요청, 결과 future, 큐 진입 시각, 출력 길이 예측)
+QueueEntry = Tuple[ChatRequest, asyncio.Future, float, Optional[LengthPrediction]]
+
+# 길이 기반 재정렬 범위: 큐 앞쪽 max_batch_size * 이 값 (backlog 크기와 무관한 비용)
+REORDER_WINDOW_BATCHES = 8
+
+
+def request_key(request: ChatRequest) -> str:
+    """동일 요청 판별용 키 (stream 여부는 응답 내용에 영향 없음)"""
+    return request.model_dump_json(exclude={"stream"})
+
+
+STAT_KEYS = (
+    "total_requests",
+    "total_batches",
+    "upstream_requests",
+    "singleflight_hits",
+    "fanout_merged",
+    "throttled_batches",
+    "stream_requests",
+)
+WINDOW_METRICS = (
+    "batch_size",
+    "queue_wait_ms",
+    "batch_duration_ms",
+    "request_latency_ms",
+)
+
+
+class ModelQueue:
+    """모델 하나의 요청 큐, 배치 정책, 통계"""
+
+    def __init__(self, model: str, policy: ModelBatchPolicy):
+        self.model = model
+        self.queue: deque = deque()
+        self.max_batch_size = policy.max_batch_size
+        self.timeout_ms = policy.timeout_ms
+        self.slots = (
+            asyncio.Semaphore(policy.max_concurrency)
+            if policy.max_concurrency
+            else None
+        )
+        self.token_budget = policy.token_budget
+        self.processing = False
+        self.stats = dict.fromkeys(STAT_KEYS, 0)
+        self.stats["avg_batch_size"] = 0.0
+        self.window_stats = WindowedStats(
+            WINDOW_METRICS, bucket_seconds=settings.batch_stats_bucket_seconds
+        )
+
 
 class BatchHandler:
     """
@@ -18,105 +76,356 @@ class BatchHandler:
 
     vLLM의 continuous batching을 최대한 활용하기 위해,
     vLLM Engine의 max-num-seqs 값과 batch_max_size 값을 동일하게 설정 필요
+
+    모델별 큐
+    - 모델(LoRA adapter)마다 큐와 배치 정책(크기, 타임아웃, 동시성)을 따로 가짐
+    - 한 배치에 여러 모델이 섞이지 않음 (vLLM은 LoRA 혼합 배치가 비효율적)
+
+    동일 요청 병합 (coalescing)
+    - temperature=0 요청: 이미 처리 중인 동일 요청의 결과를 공유 (singleflight)
+    - 샘플링 요청: 같은 배치 안의 동일 요청을 n=k 요청 하나로 합쳐 전송
+
+    엔진 부하 기반 throttling
+    - engine_metrics 기준 모든 backend가 과부하면 배치 전송을 보류하고 큐에 누적
+
+    출력 길이 예측 기반 배치 구성 (length_predictor 사용 시)
+    - 배치는 가장 긴 요청이 끝나야 완료되므로, 예상 길이가 짧은 요청부터 묶어
+      짧은 요청이 긴 요청 뒤에서 기다리지 않게 함
+    - 재정렬은 큐 앞쪽 일부(max_batch_size * REORDER_WINDOW_BATCHES)만 대상
+      (throttling으로 backlog가 쌓여도 배치당 비용 일정)
+    - batch_max_reorder_delay_ms 이상 기다린 요청은 길이와 무관하게 먼저
+      (긴 요청 starvation 방지)
+    - token_budget 설정 시 배치의 tail 예측 합이 예산을 넘지 않게 구성
+
+    스트리밍 요청
+    - 배치로 묶거나 병합하지 않고, 모델별 동시성 상한과 엔진 throttling만 적용
     """
 
-    def __init__(self, vllm_client: VLLMClient):
+    def __init__(
+        self,
+        vllm_client: VLLMClient,
+        engine_metrics: Optional[EngineMetricsCollector] = None,
+        length_predictor: Optional[OutputLengthPredictor] = None,
+    ):
         self.client = vllm_client
-        self.queue: deque = deque()
-        self.max_batch_size = settings.batch_max_size
-        self.timeout_ms = settings.batch_timeout_ms
-        self._processing = False
-        self._stats = {
-            "total_requests": 0,
-            "total_batches": 0,
-            "avg_batch_size": 0.0,
-        }
-
-    async def add_request(self, request: ChatRequest) -> ChatResponse:
+        self.engine_metrics = engine_metrics
+        self.length_predictor = length_predictor
+        self.coalesce_enabled = settings.batch_coalesce_enabled
+        self.queues: Dict[str, ModelQueue] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 전체 슬라이딩 윈도우(1m/5m/15m) 백분위수용 시간 구간 히스토그램
+        self._window_stats = WindowedStats(
+            WINDOW_METRICS, bucket_seconds=settings.batch_stats_bucket_seconds
+        )
+
+    def _model_queue(self, model: str) -> ModelQueue:
+        model_queue = self.queues.get(model)
+        if model_queue is None:
+            model_queue = self.queues[model] = ModelQueue(
+                model, settings.batch_policy(model)
+            )
+        return model_queue
+
+    def _record(self, mq: ModelQueue, name: str, value: float) -> None:
+        mq.window_stats.record(name, value)
+        self._window_stats.record(name, value)
+
+    async def add_request(
+        self,
+        request: ChatRequest,
+        tenant: Optional[str] = None,
+        prediction: Optional[LengthPrediction] = None,
+    ) -> ChatResponse:
         """
-        요청을 큐에 추가하고 배치 처리 결과 대기
+        요청을 모델별 큐에 추가하고 배치 처리 결과 대기
+        (tenant: 출력 길이 예측 feature, 보통 API 키
+         prediction: 호출 측에서 이미 계산한 출력 길이 예측, 없으면 여기서 예측)
         """
-        future = asyncio.Future()
-        self.queue.append((request, future))
-        self._stats["total_requests"] += 1
+        mq = self._model_queue(request.model or settings.vllm_model)
+        mq.stats["total_requests"] += 1
+        start_time = time.perf_counter()
+
+        # 결정적 요청은 처리 중인 동일 요청에 합류
+        key = None
+        if self.coalesce_enabled and request.temperature == 0:
+            key = request_key(request)
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                mq.stats["singleflight_hits"] += 1
+                record_coalesced_requests(mq.model, "singleflight", 1)
+                response = await asyncio.shield(inflight)
+                self._record_latency(mq, start_time)
+                return response
+
+        future = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        if prediction is None and self.length_predictor is not None:
+            prediction = self.length_predictor.predict(request, tenant)
+        mq.queue.append((request, future, start_time, prediction))
 
         # 배치 처리 시작 (없으면)
-        if not self._processing:
-            asyncio.create_task(self._process_batch())
+        if not mq.processing:
+            asyncio.create_task(self._process_batch(mq))
 
-        # 결과 대기
-        return await future
+        # 결과 대기 (shield: 이 요청이 취소돼도 합류한 요청들의 결과는 유지,
+        # future는 _dispatch_group에서만 완료됨)
+        response = await asyncio.shield(future)
+        self._record_latency(mq, start_time)
+        return response
 
-    async def _process_batch(self):
-        """배치 처리 로직"""
-        if self._processing:
+    async def stream_request(self, request: ChatRequest) -> AsyncIterator[ChatDelta]:
+        """
+        스트리밍 요청을 모델별 스케줄링(동시성 슬롯, 엔진 throttling) 하에 실행
+        - 소비자가 중간에 멈추면 슬롯을 반환하고 upstream 생성도 중단됨
+        """
+        mq = self._model_queue(request.model or settings.vllm_model)
+        mq.stats["total_requests"] += 1
+        mq.stats["stream_requests"] += 1
+        start_time = time.perf_counter()
+
+        await self._wait_for_engine_capacity(mq)
+        if mq.slots is not None:
+            await mq.slots.acquire()
+        try:
+            self._record(mq, "queue_wait_ms", (time.perf_counter() - start_time) * 1000)
+            mq.stats["upstream_requests"] += 1
+            async with aclosing(self.client.chat_completion_stream(request)) as stream:
+                async for delta in stream:
+                    yield delta
+        finally:
+            if mq.slots is not None:
+                mq.slots.release()
+        self._record_latency(mq, start_time)
+
+    def _record_latency(self, mq: ModelQueue, start_time: float) -> None:
+        self._record(
+            mq, "request_latency_ms", (time.perf_counter() - start_time) * 1000
+        )
+
+    def _take_batch(self, mq: ModelQueue) -> List[QueueEntry]:
+        """큐에서 다음 배치 추출 (예측기가 없으면 FIFO)"""
+        queue = mq.queue
+        if self.length_predictor is None:
+            batch = []
+            while queue and len(batch) < mq.max_batch_size:
+                batch.append(queue.popleft())
+            return batch
+
+        # 큐 앞쪽(가장 오래 기다린) 일부만 재정렬
+        # 오래 기다린 요청 먼저(FIFO), 나머지는 예상 길이가 짧은 순
+        window_size = min(len(queue), mq.max_batch_size * REORDER_WINDOW_BATCHES)
+        entries = [queue.popleft() for _ in range(window_size)]
+        now = time.perf_counter()
+        max_delay = settings.batch_max_reorder_delay_ms / 1000
+        order = sorted(
+            range(len(entries)),
+            key=lambda i: (
+                (0, i)
+                if now - entries[i][2] >= max_delay
+                else (1, entries[i][3].expected, i)
+            ),
+        )
+
+        selected: List[int] = []
+        tokens = 0
+        for i in order:
+            if len(selected) >= mq.max_batch_size:
+                break
+            tail = entries[i][3].tail
+            if mq.token_budget and selected and tokens + tail > mq.token_budget:
+                continue
+            selected.append(i)
+            tokens += tail
+
+        # 선택되지 않은 요청은 원래 순서대로 큐 앞에 되돌림
+        taken = set(selected)
+        queue.extendleft(
+            entries[i] for i in reversed(range(len(entries))) if i not in taken
+        )
+        return [entries[i] for i in selected]
+
+    def _group_batch(
+        self, batch: List[QueueEntry]
+    ) -> List[Tuple[ChatRequest, List[asyncio.Future]]]:
+        """배치 내 동일 샘플링 요청을 하나의 n=k 요청으로 묶기"""
+        if not self.coalesce_enabled:
+            return [(request, [future]) for request, future, *_ in batch]
+
+        groups: Dict[str, Tuple[ChatRequest, List[asyncio.Future]]] = {}
+        for request, future, *_ in batch:
+            key = request_key(request)
+            if key in groups:
+                groups[key][1].append(future)
+            else:
+                groups[key] = (request, [future])
+        return list(groups.values())
+
+    async def _dispatch_group(
+        self, mq: ModelQueue, request: ChatRequest, futures: List[asyncio.Future]
+    ) -> None:
+        """그룹 하나를 vLLM으로 전송하고 결과를 future에 분배"""
+        try:
+            if mq.slots is not None:
+                await mq.slots.acquire()
+            try:
+                if len(futures) == 1:
+                    responses = [await self.client.chat_completion(request)]
+                else:
+                    responses = await self.client.chat_completion_n(
+                        request, n=len(futures)
+                    )
+            finally:
+                if mq.slots is not None:
+                    mq.slots.release()
+        except Exception as e:
+            logger.error(f"Batch request failed: {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
             return
 
-        self._processing = True
+        for future, response in zip(futures, responses):
+            if not future.done():
+                future.set_result(response)
+
+        # n을 무시하거나 일부만 응답한 backend: 남은 요청이 영원히 대기하지 않도록
+        if len(responses) < len(futures):
+            error = RuntimeError(
+                f"Upstream returned {len(responses)} choices, expected {len(futures)}"
+            )
+            logger.error(f"Batch request failed: {error}")
+            for future in futures[len(responses) :]:
+                if not future.done():
+                    future.set_exception(error)
+
+    async def _wait_for_engine_capacity(self, mq: ModelQueue) -> None:
+        """엔진 과부하 시 최대 engine_throttle_max_wait_ms까지 배치 전송 보류"""
+        if self.engine_metrics is None:
+            return
+
+        waited_ms = 0
+        backoff_ms = settings.engine_throttle_backoff_ms
+        while (
+            waited_ms < settings.engine_throttle_max_wait_ms
+            and self.engine_metrics.should_throttle(settings.model_base_urls(mq.model))
+        ):
+            if waited_ms == 0:
+                mq.stats["throttled_batches"] += 1
+                record_batch_throttled()
+            await asyncio.sleep(backoff_ms / 1000)
+            waited_ms += backoff_ms
+
+    async def _process_batch(self, mq: ModelQueue):
+        """배치 처리 로직 (모델 하나의 큐)"""
+        if mq.processing:
+            return
+
+        mq.processing = True
+        batch = []
 
         try:
             # 타임아웃 또는 최대 배치 크기까지 대기
-            await asyncio.sleep(self.timeout_ms / 1000)
+            await asyncio.sleep(mq.timeout_ms / 1000)
+            await self._wait_for_engine_capacity(mq)
 
-            if not self.queue:
+            if not mq.queue:
                 return
 
             # 큐에서 배치 추출
-            batch = []
-            futures = []
-
-            while self.queue and len(batch) < self.max_batch_size:
-                request, future = self.queue.popleft()
-                batch.append(request)
-                futures.append(future)
+            batch = self._take_batch(mq)
 
             if not batch:
                 return
 
             batch_size = len(batch)
-            logger.info(f"Processing batch of {batch_size} requests")
+            dispatched_at = time.perf_counter()
+            for _, _, enqueued_at, _ in batch:
+                self._record(mq, "queue_wait_ms", (dispatched_at - enqueued_at) * 1000)
+
+            groups = self._group_batch(batch)
+            merged = batch_size - len(groups)
+            logger.info(
+                f"Processing {mq.model} batch of {batch_size} requests "
+                f"({len(groups)} upstream, {merged} merged)"
+            )
 
-            # vLLM으로 배치 전송
+            # vLLM으로 배치 전송 (그룹별 동시 요청 → vLLM continuous batching)
             start_time = time.perf_counter()
-            responses = await self.client.batch_chat_completion(batch)
+            await asyncio.gather(
+                *(
+                    self._dispatch_group(mq, request, futures)
+                    for request, futures in groups
+                )
+            )
             total_time = (time.perf_counter() - start_time) * 1000
 
             # 📊 메트릭 기록
             record_batch_metrics(
-                batch_size=batch_size, duration_seconds=total_time / 1000
+                model=mq.model,
+                batch_size=batch_size,
+                duration_seconds=total_time / 1000,
             )
+            if merged:
+                record_coalesced_requests(mq.model, "fanout", merged)
+            self._record(mq, "batch_size", batch_size)
+            self._record(mq, "batch_duration_ms", total_time)
 
             # 통계 업데이트
-            self._stats["total_batches"] += 1
-            self._stats["avg_batch_size"] = (
-                self._stats["avg_batch_size"] * (self._stats["total_batches"] - 1)
-                + batch_size
-            ) / self._stats["total_batches"]
+            stats = mq.stats
+            stats["total_batches"] += 1
+            stats["upstream_requests"] += len(groups)
+            stats["fanout_merged"] += merged
+            stats["avg_batch_size"] = (
+                stats["avg_batch_size"] * (stats["total_batches"] - 1) + batch_size
+            ) / stats["total_batches"]
 
             logger.info(
                 f"Batch completed: {batch_size} requests in {total_time:.2f}ms "
                 f"({batch_size / (total_time / 1000):.2f} req/s)"
             )
 
-            # Future에 결과 전달
-            for future, response in zip(futures, responses):
-                if not future.done():
-                    future.set_result(response)
-
         except Exception as e:
             logger.error(f"Batch processing failed: {e}")
-            # 에러 시 모든 future에 에러 전달
-            for _, future in list(self.queue):
+            # 에러 시 배치의 모든 future에 에러 전달
+            for _, future, *_ in batch:
                 if not future.done():
                     future.set_exception(e)
 
         finally:
-            self._processing = False
+            mq.processing = False
 
             # 큐에 남은 요청이 있으면 다시 처리
-            if self.queue:
-                asyncio.create_task(self._process_batch())
+            if mq.queue:
+                asyncio.create_task(self._process_batch(mq))
+
+    @staticmethod
+    def _summarize(stats: Dict) -> Dict:
+        coalesced = stats["singleflight_hits"] + stats["fanout_merged"]
+        total = stats["total_requests"]
+        stats["coalescing_ratio"] = coalesced / total if total else 0.0
+        return stats
 
     def get_stats(self) -> Dict:
-        """배치 처리 통계"""
-        return self._stats.copy()
+        """배치 처리 통계 (전체 + 모델별)"""
+        stats = dict.fromkeys(STAT_KEYS, 0)
+        batched = 0.0
+        models = {}
+        for model, mq in self.queues.items():
+            for key in STAT_KEYS:
+                stats[key] += mq.stats[key]
+            batched += mq.stats["avg_batch_size"] * mq.stats["total_batches"]
+            models[model] = self._summarize(mq.stats.copy())
+            models[model]["queue_depth"] = len(mq.queue)
+            models[model]["windows"] = mq.window_stats.snapshot()
+
+        stats["avg_batch_size"] = (
+            batched / stats["total_batches"] if stats["total_batches"] else 0.0
+        )
+        self._summarize(stats)
+        stats["windows"] = self._window_stats.snapshot()
+        stats["models"] = models
+        if self.length_predictor is not None:
+            stats["length_predictor"] = self.length_predictor.get_stats()
+        return stats
@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from src.api.middleware.metrics import record_cascade
+from src.config import settings
+from src.models.schemas import ChatRequest, ChatResponse, MessageRole
+from src.services.length_predictor import LengthPrediction, OutputLengthPredictor
+from src.services.window_stats import WindowedStats
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ("fast", "quality", "escalated")
+
+# 유사 프롬프트 escalation 비율 EWMA 가중치
+HISTORY_ALPHA = 0.2
+
+
+def keyword_pattern(keywords: str) -> Optional[re.Pattern]:
+    """
+    콤마 구분 키워드 → 단어 경계 매칭 정규식 ("prove"가 "improve"에 매칭되지 않도록)
+    - 한글 키워드는 조사가 붙으므로 앞쪽 경계만 확인 ("코드를", "분석해줘")
+    """
+    parts = []
+    for keyword in keywords.split(","):
+        keyword = keyword.strip().lower()
+        if not keyword:
+            continue
+        suffix = r"\b" if keyword.isascii() else ""
+        parts.append(rf"\b{re.escape(keyword)}{suffix}")
+    return re.compile("|".join(parts)) if parts else None
+
+
+class CascadeRouter:
+    """
+    비용 기반 모델 cascade
+
+    - 로컬 feature(프롬프트 길이, 예상 출력 길이, 키워드, 유사 프롬프트의 과거
+      결과)로 쉬운 요청은 fast 모델, 나머지는 quality 모델로 라우팅
+    - 예상 출력 길이는 length_predictor의 tail 예측 (없으면 max_tokens이므로
+      클라이언트가 max_tokens를 cascade_fast_max_tokens 이하로 지정해야 fast 가능)
+    - escalate=True 요청은 fast 모델 응답이 길이 제한에 걸리면 quality 모델로 재시도
+    - 절약한 GPU 시간은 quality 모델의 토큰당 latency(EWMA) 기준 추정치
+    """
+
+    def __init__(
+        self,
+        fast_model: str,
+        quality_model: str,
+        length_predictor: Optional[OutputLengthPredictor] = None,
+    ):
+        self.fast_model = fast_model
+        self.quality_model = quality_model
+        self.length_predictor = length_predictor
+        self.keywords = keyword_pattern(settings.cascade_quality_keywords)
+        self._history: OrderedDict[str, float] = OrderedDict()
+        self._quality_s_per_token: Optional[float] = None
+        self._stats = dict.fromkeys(ROUTES, 0)
+        self.gpu_seconds_saved = 0.0
+        self._window_stats = WindowedStats(
+            [f"{route}_latency_ms" for route in ROUTES],
+            bucket_seconds=settings.batch_stats_bucket_seconds,
+        )
+
+    @staticmethod
+    def similarity_key(request: ChatRequest) -> str:
+        """유사 프롬프트 판별 키: system 프롬프트 + 마지막 user 메시지 앞부분"""
+        system = "".join(
+            m.content for m in request.messages if m.role == MessageRole.SYSTEM
+        )
+        last_user = next(
+            (
+                m.content
+                for m in reversed(request.messages)
+                if m.role == MessageRole.USER
+            ),
+            "",
+        )
+        head = " ".join(last_user.lower().split()[:8])
+        return hashlib.sha1(f"{system}\0{head}".encode()).hexdigest()[:16]
+
+    def choose(
+        self,
+        request: ChatRequest,
+        tenant: Optional[str] = None,
+        prediction: Optional[LengthPrediction] = None,
+    ) -> str:
+        """fast / quality 라우팅 결정 (prediction: 호출 측에서 계산한 예측)"""
+        if prediction is None and self.length_predictor is not None:
+            prediction = self.length_predictor.predict(request, tenant)
+        expected_tokens = (
+            prediction.tail if prediction is not None else request.max_tokens
+        )
+        if expected_tokens > settings.cascade_fast_max_tokens:
+            return "quality"
+
+        if sum(len(m.content) for m in request.messages) > (
+            settings.cascade_fast_prompt_chars
+        ):
+            return "quality"
+
+        text = " ".join(m.content for m in request.messages).lower()
+        if self.keywords is not None and self.keywords.search(text):
+            return "quality"
+
+        escalation_rate = self._history.get(self.similarity_key(request), 0.0)
+        if escalation_rate >= settings.cascade_escalation_threshold:
+            return "quality"
+
+        return "fast"
+
+    def _record_outcome(self, request: ChatRequest, truncated: bool) -> None:
+        """fast 모델 결과를 유사 프롬프트 이력에 반영 (LRU 크기 제한)"""
+        key = self.similarity_key(request)
+        previous = self._history.pop(key, 0.0)
+        self._history[key] = previous + HISTORY_ALPHA * (float(truncated) - previous)
+        if len(self._history) > settings.cascade_history_size:
+            self._history.popitem(last=False)
+
+    def _observe_quality(self, response: ChatResponse) -> None:
+        tokens = max(1, response.usage.get("completion_tokens", 0))
+        s_per_token = response.latency_ms / 1000 / tokens
+        if self._quality_s_per_token is None:
+            self._quality_s_per_token = s_per_token
+        else:
+            self._quality_s_per_token += 0.1 * (s_per_token - self._quality_s_per_token)
+
+    def _finish(self, route: str, start_time: float, saved_seconds: float) -> None:
+        latency = time.perf_counter() - start_time
+        self._stats[route] += 1
+        self.gpu_seconds_saved += saved_seconds
+        self._window_stats.record(f"{route}_latency_ms", latency * 1000)
+        record_cascade(route, latency, saved_seconds)
+
+    async def run(
+        self,
+        request: ChatRequest,
+        send: Callable[[ChatRequest], Awaitable[ChatResponse]],
+        tenant: Optional[str] = None,
+        prediction: Optional[LengthPrediction] = None,
+    ) -> ChatResponse:
+        """라우팅 후 send로 전송 (send: VLLMClient.chat_completion 등)"""
+        start_time = time.perf_counter()
+
+        if self.choose(request, tenant, prediction) == "quality":
+            response = await send(
+                request.model_copy(update={"model": self.quality_model})
+            )
+            self._observe_quality(response)
+            self._finish("quality", start_time, 0.0)
+            return response
+
+        response = await send(request.model_copy(update={"model": self.fast_model}))
+        truncated = response.finish_reason == "length"
+        self._record_outcome(request, truncated)
+        fast_seconds = response.latency_ms / 1000
+
+        if not (truncated and request.escalate):
+            saved = 0.0
+            if self._quality_s_per_token is not None:
+                estimated = self._quality_s_per_token * response.usage.get(
+                    "completion_tokens", 0
+                )
+                saved = max(0.0, estimated - fast_seconds)
+            self._finish("fast", start_time, saved)
+            return response
+
+        # fast 응답이 잘림 → quality 모델로 재시도 (fast 처리 시간은 손실)
+        logger.info("Cascade escalation: fast model response truncated")
+        fast_usage = response.usage
+        response = await send(request.model_copy(update={"model": self.quality_model}))
+        self._observe_quality(response)
+        self._finish("escalated", start_time, -fast_seconds)
+        # usage는 두 생성의 합 (rate limit 정산에 잘린 fast 생성분도 포함)
+        usage = {
+            key: fast_usage.get(key, 0) + response.usage.get(key, 0)
+            for key in fast_usage.keys() | response.usage.keys()
+        }
+        return response.model_copy(update={"usage": usage})
+
+    def get_stats(self) -> Dict:
+        """route별 요청 수, latency, 절약 GPU 시간(추정)"""
+        total = sum(self._stats.values())
+        fast_attempts = self._stats["fast"] + self._stats["escalated"]
+        return {
+            "fast_model": self.fast_model,
+            "quality_model": self.quality_model,
+            "routes": self._stats.copy(),
+            "fast_ratio": self._stats["fast"] / total if total else 0.0,
+            "escalation_rate": (
+                self._stats["escalated"] / fast_attempts if fast_attempts else 0.0
+            ),
+            "gpu_seconds_saved": self.gpu_seconds_saved,
+            "windows": self._window_stats.snapshot(),
+        }
+
+
+def create_cascade_router(
+    length_predictor: Optional[OutputLengthPredictor] = None,
+) -> Optional[CascadeRouter]:
+    """설정 기반 cascade router 생성 (비활성화 시 None)"""
+    if not settings.cascade_enabled or not settings.cascade_fast_model:
+        return None
+    return CascadeRouter(
+        settings.cascade_fast_model, settings.vllm_model, length_predictor
+    )
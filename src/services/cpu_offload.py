@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+from src.api.middleware.metrics import record_cpu_offload, record_event_loop_lag
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.offload_workers, thread_name_prefix="cpu-offload"
+        )
+    return _executor
+
+
+async def offload(task: str, size: int, func: Callable[..., T], *args) -> T:
+    """
+    CPU 작업을 크기에 따라 worker 스레드에서 실행
+
+    - size < offload_min_bytes: 이벤트 루프에서 바로 실행 (스레드 전환 비용이 더 큼)
+    - 그 이상: 스레드 풀에서 실행, 루프는 GIL switch interval마다 다른 요청 처리
+    """
+    if size < settings.offload_min_bytes:
+        return func(*args)
+
+    record_cpu_offload(task)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(func, *args))
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+class EventLoopLagMonitor:
+    """주기적으로 sleep하여 예정 시각 대비 지연(event loop lag)을 측정"""
+
+    def __init__(self, interval_ms: int):
+        self.interval_s = interval_ms / 1000
+        self.max_lag_s = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.max_lag_s = max(self.max_lag_s, lag)
+            record_event_loop_lag(lag)
+            if lag > 1.0:
+                logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
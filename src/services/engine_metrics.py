@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import httpx
+
+from src.api.middleware.metrics import record_engine_load
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# vLLM Prometheus 지표 → EngineLoad 필드
+# (gpu_cache_usage_perc: V0 엔진, kv_cache_usage_perc: V1 엔진)
+ENGINE_METRICS = {
+    b"vllm:num_requests_running": "running",
+    b"vllm:num_requests_waiting": "waiting",
+    b"vllm:gpu_cache_usage_perc": "kv_cache_usage",
+    b"vllm:kv_cache_usage_perc": "kv_cache_usage",
+}
+
+
+@dataclass(slots=True)
+class EngineLoad:
+    """vLLM 엔진 부하 스냅샷"""
+
+    running: float = 0.0
+    waiting: float = 0.0
+    kv_cache_usage: float = 0.0  # 0.0 ~ 1.0
+    scraped_at: float = 0.0
+
+    def overloaded(self) -> bool:
+        """신규 배치 전송을 미뤄야 하는 상태"""
+        return (
+            self.waiting >= settings.engine_throttle_waiting
+            or self.kv_cache_usage >= settings.engine_throttle_kv_usage
+        )
+
+    def score(self, inflight: int = 0) -> tuple:
+        """
+        라우팅 우선순위 (작을수록 여유)
+        - inflight: 마지막 수집 이후 gateway가 보낸 요청 수 (수집 주기 사이 쏠림 방지)
+        """
+        return (
+            self.overloaded(),
+            self.waiting + self.running + inflight,
+            self.kv_cache_usage,
+        )
+
+
+def parse_engine_metrics(body: bytes) -> EngineLoad:
+    """
+    Prometheus text 포맷에서 필요한 vLLM 지표만 추출
+    - 'vllm:' 접두사가 아닌 줄은 바로 건너뜀 (전체 파서 미사용)
+    - 라벨 세트(엔진/모델)별 값은 running/waiting 합산, KV cache는 최대값
+    """
+    load = EngineLoad()
+    for line in body.splitlines():
+        if not line.startswith(b"vllm:"):
+            continue
+
+        brace = line.find(b"{")
+        if brace >= 0:
+            name = line[:brace]
+            rest = line[line.rfind(b"}") + 1 :]
+        else:
+            name, _, rest = line.partition(b" ")
+
+        field = ENGINE_METRICS.get(name)
+        if field is None:
+            continue
+
+        try:
+            value = float(rest.split()[0])
+        except (IndexError, ValueError):
+            continue
+
+        if field == "kv_cache_usage":
+            load.kv_cache_usage = max(load.kv_cache_usage, value)
+        else:
+            setattr(load, field, getattr(load, field) + value)
+
+    return load
+
+
+class EngineMetricsCollector:
+    """
+    vLLM backend별 /metrics를 주기적으로 수집하는 백그라운드 collector
+
+    - 수집한 부하는 배치 전송 throttling과 backend 라우팅에 사용
+    - 같은 값을 gateway 지표(vllm_engine_*)로 재노출 (autoscaling 신호)
+    - stale_s보다 오래된 스냅샷은 무시 (수집 실패 시 부하 정보 없이 동작)
+    """
+
+    def __init__(
+        self,
+        base_urls: List[str],
+        interval_s: float = 1.0,
+        stale_s: float = 5.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_urls = base_urls
+        self.interval_s = interval_s
+        self.stale_s = stale_s
+        self._http = httpx.AsyncClient(timeout=interval_s, transport=transport)
+        self._loads: Dict[str, EngineLoad] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def _scrape(self, base_url: str) -> None:
+        try:
+            response = await self._http.get(f"{base_url}/metrics")
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.debug(f"Engine metrics scrape failed for {base_url}: {e}")
+            return
+
+        load = parse_engine_metrics(response.content)
+        load.scraped_at = time.monotonic()
+        self._loads[base_url] = load
+        record_engine_load(base_url, load.running, load.waiting, load.kv_cache_usage)
+
+    async def scrape_once(self) -> None:
+        """모든 backend 1회 수집"""
+        await asyncio.gather(*(self._scrape(url) for url in self.base_urls))
+
+    async def _run(self) -> None:
+        while True:
+            await self.scrape_once()
+            await asyncio.sleep(self.interval_s)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._http.aclose()
+
+    def load(self, base_url: str) -> Optional[EngineLoad]:
+        """최신 부하 스냅샷 (없거나 stale이면 None)"""
+        load = self._loads.get(base_url)
+        if load is None or time.monotonic() - load.scraped_at > self.stale_s:
+            return None
+        return load
+
+    def should_throttle(self, base_urls: Optional[List[str]] = None) -> bool:
+        """
+        모든 backend의 부하 정보가 최신이고 모두 과부하일 때만 True
+        (정보가 없는 backend가 하나라도 있으면 보류하지 않음)
+        """
+        loads = [self.load(url) for url in base_urls or self.base_urls]
+        known = [load for load in loads if load is not None]
+        return (
+            bool(known)
+            and len(known) == len(loads)
+            and all(load.overloaded() for load in known)
+        )
+
+    def least_loaded(
+        self, base_urls: List[str], inflight: Optional[Dict[str, int]] = None
+    ) -> Optional[str]:
+        """
+        가장 여유 있는 backend (부하 정보가 하나도 없으면 None)
+        - 수집 실패/stale인 backend는 gateway inflight만으로 점수를 매김
+          (정상 서빙 중인데 /metrics만 실패한 backend도 계속 트래픽을 받도록)
+        """
+        loads = [self.load(url) for url in base_urls]
+        if all(load is None for load in loads):
+            return None
+
+        best_url, best_score = None, None
+        for url, load in zip(base_urls, loads):
+            score = (load or EngineLoad()).score(
+                inflight.get(url, 0) if inflight else 0
+            )
+            if best_score is None or score < best_score:
+                best_url, best_score = url, score
+        return best_url
+
+
+def create_engine_metrics_collector(
+    base_urls: List[str],
+) -> Optional[EngineMetricsCollector]:
+    """설정 기반 collector 생성 (비활성화 시 None)"""
+    if not settings.engine_metrics_enabled:
+        return None
+    return EngineMetricsCollector(
+        base_urls,
+        interval_s=settings.engine_metrics_interval_s,
+        stale_s=settings.engine_metrics_stale_s,
+    )
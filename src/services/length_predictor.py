@@ -0,0 +1,211 @@
+import bisect
+import zlib
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from src.api.middleware.metrics import record_length_prediction
+from src.config import settings
+from src.models.schemas import ChatRequest, MessageRole
+from src.services.window_stats import WindowedStats
+
+# 출력 길이 구간 상한 (√2 간격, ChatRequest.max_tokens 상한 2048까지)
+LENGTH_BUCKETS = tuple(sorted({round(2 ** (i / 2)) for i in range(23)}))
+
+
+@dataclass(slots=True)
+class LengthPrediction:
+    """예상 출력 길이 (expected: 평균, tail: 상위 분위수, 모두 max_tokens 이하)"""
+
+    expected: float
+    tail: int
+    samples: int  # 예측에 사용한 구간의 샘플 수 (0: 데이터 없음 → max_tokens)
+
+
+class LengthHistogram:
+    """
+    출력 길이 히스토그램 (구간별 count, 고정 크기)
+
+    - 샘플이 max_samples에 도달하면 count를 절반으로 줄여 최근 분포를 따라감
+    - 분위수는 해당 구간의 상한 (보수적)
+    """
+
+    __slots__ = ("counts", "total", "sum")
+
+    def __init__(self):
+        self.counts = array("I", bytes(4 * len(LENGTH_BUCKETS)))
+        self.total = 0
+        self.sum = 0.0
+
+    def add(self, tokens: int, max_samples: int) -> None:
+        index = min(bisect.bisect_left(LENGTH_BUCKETS, tokens), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.total += 1
+        self.sum += tokens
+        if self.total >= max_samples:
+            for i, count in enumerate(self.counts):
+                self.counts[i] = count // 2
+            self.total = sum(self.counts)
+            self.sum /= 2
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+    def quantile(self, q: float) -> int:
+        rank = q * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and seen > 0:
+                return LENGTH_BUCKETS[index]
+        return LENGTH_BUCKETS[-1]
+
+
+def prompt_bucket(request: ChatRequest) -> int:
+    """프롬프트 길이 구간 (문자 수의 log2)"""
+    return sum(len(m.content) for m in request.messages).bit_length()
+
+
+def system_hash(request: ChatRequest) -> int:
+    """system 프롬프트 해시 (같은 앱/템플릿 판별용)"""
+    system = "".join(
+        m.content for m in request.messages if m.role == MessageRole.SYSTEM
+    )
+    return zlib.crc32(system.encode())
+
+
+class OutputLengthPredictor:
+    """
+    요청 feature별 출력 길이(usage.completion_tokens) 온라인 학습
+
+    feature 계층 (샘플이 min_samples 미만이면 다음 단계로 backoff)
+    1. 모델, system 프롬프트, tenant, 프롬프트 길이 구간, max_tokens
+    2. system 프롬프트, 프롬프트 길이 구간
+    3. 전체
+    데이터가 없으면 max_tokens를 그대로 사용 (기존 동작과 동일)
+
+    정확도는 관측 직전 예측과 실제 값을 비교해 기록 (predict-then-update)
+    """
+
+    def __init__(self, quantile: float, min_samples: int, max_keys: int):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.max_keys = max_keys
+        self.max_samples = max(min_samples * 50, 1000)
+        self._exact: OrderedDict[Tuple, LengthHistogram] = OrderedDict()
+        self._coarse: OrderedDict[Tuple, LengthHistogram] = OrderedDict()
+        self._global = LengthHistogram()
+        self._stats = {
+            "observations": 0,
+            "predicted": 0,
+            "abs_error_tokens": 0.0,
+            "max_tokens_error_tokens": 0.0,
+            "within_tail": 0,
+        }
+        self._window_stats = WindowedStats(
+            ("abs_error_tokens",), bucket_seconds=settings.batch_stats_bucket_seconds
+        )
+
+    @staticmethod
+    def _keys(request: ChatRequest, tenant: Optional[str]) -> Tuple[Tuple, Tuple]:
+        system = system_hash(request)
+        prompt = prompt_bucket(request)
+        exact = (
+            request.model or settings.vllm_model,
+            system,
+            tenant,
+            prompt,
+            request.max_tokens,
+        )
+        return exact, (system, prompt)
+
+    def predict(
+        self, request: ChatRequest, tenant: Optional[str] = None
+    ) -> LengthPrediction:
+        """예상 출력 길이 (평균과 tail 분위수)"""
+        exact, coarse = self._keys(request, tenant)
+        for histogram in (self._exact.get(exact), self._coarse.get(coarse)):
+            if histogram is not None and histogram.total >= self.min_samples:
+                return self._prediction(request, histogram)
+        if self._global.total >= self.min_samples:
+            return self._prediction(request, self._global)
+        return LengthPrediction(
+            expected=request.max_tokens, tail=request.max_tokens, samples=0
+        )
+
+    def _prediction(
+        self, request: ChatRequest, histogram: LengthHistogram
+    ) -> LengthPrediction:
+        return LengthPrediction(
+            expected=min(histogram.mean, request.max_tokens),
+            tail=min(histogram.quantile(self.quantile), request.max_tokens),
+            samples=histogram.total,
+        )
+
+    def _histogram(self, table: OrderedDict, key: Tuple) -> LengthHistogram:
+        """key의 히스토그램 (LRU, max_keys 초과 시 가장 오래된 key 제거)"""
+        histogram = table.pop(key, None)
+        if histogram is None:
+            histogram = LengthHistogram()
+            if len(table) >= self.max_keys:
+                table.popitem(last=False)
+        table[key] = histogram
+        return histogram
+
+    def observe(
+        self, request: ChatRequest, completion_tokens: int, tenant: Optional[str] = None
+    ) -> None:
+        """실제 출력 길이 반영 (반영 전 예측으로 정확도 기록)"""
+        prediction = self.predict(request, tenant)
+        stats = self._stats
+        stats["observations"] += 1
+        if prediction.samples:
+            error = abs(prediction.expected - completion_tokens)
+            within_tail = completion_tokens <= prediction.tail
+            stats["predicted"] += 1
+            stats["abs_error_tokens"] += error
+            stats["max_tokens_error_tokens"] += request.max_tokens - completion_tokens
+            stats["within_tail"] += within_tail
+            self._window_stats.record("abs_error_tokens", error)
+            record_length_prediction(error, within_tail)
+
+        exact, coarse = self._keys(request, tenant)
+        for histogram in (
+            self._histogram(self._exact, exact),
+            self._histogram(self._coarse, coarse),
+            self._global,
+        ):
+            histogram.add(completion_tokens, self.max_samples)
+
+    def get_stats(self) -> Dict:
+        """예측 정확도 (MAE, tail 커버리지, max_tokens 기준 대비 오차)"""
+        stats = self._stats
+        predicted = stats["predicted"]
+        return {
+            "observations": stats["observations"],
+            "predicted": predicted,
+            "quantile": self.quantile,
+            "mean_abs_error_tokens": (
+                stats["abs_error_tokens"] / predicted if predicted else 0.0
+            ),
+            # 예측 없이 max_tokens를 썼을 때의 평균 오차 (비교 기준)
+            "max_tokens_mean_abs_error_tokens": (
+                stats["max_tokens_error_tokens"] / predicted if predicted else 0.0
+            ),
+            "tail_coverage": stats["within_tail"] / predicted if predicted else 0.0,
+            "keys": len(self._exact),
+            "windows": self._window_stats.snapshot(),
+        }
+
+
+def create_length_predictor() -> Optional[OutputLengthPredictor]:
+    """설정 기반 출력 길이 예측기 생성 (비활성화 시 None)"""
+    if not settings.length_predictor_enabled:
+        return None
+    return OutputLengthPredictor(
+        quantile=settings.length_predictor_quantile,
+        min_samples=settings.length_predictor_min_samples,
+        max_keys=settings.length_predictor_max_keys,
+    )
@@ -0,0 +1,140 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.api.middleware.metrics import record_rate_limit
+from src.config import settings
+
+
+class RateLimitExceeded(Exception):
+    """토큰 버킷 잔량 부족"""
+
+    def __init__(self, limit: int, remaining: int, retry_after: float):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.1f}s")
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        """표준 429 응답 헤더"""
+        retry_after = max(1, int(self.retry_after + 0.999))
+        return {
+            "Retry-After": str(retry_after),
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(retry_after),
+        }
+
+
+@dataclass(slots=True)
+class Reservation:
+    """admission 시 예약한 토큰 (완료 후 실제 사용량으로 정산)"""
+
+    key: str
+    tokens: int
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class TokenBucketRateLimiter:
+    """
+    API 키별 토큰 버킷 (생성 토큰 기준)
+
+    - admission 시 예상 출력 토큰(tail 예측, 없으면 max_tokens)만큼 예약,
+      완료 후 실제 completion_tokens와의 차이 정산
+    - 버킷은 키 해시로 샤딩된 dict에 저장, 이벤트 루프 단일 스레드에서
+      락 없이 갱신 (refill은 접근 시 경과 시간으로 계산)
+    - 샤드당 키 수는 max_keys_per_shard로 제한, 초과 시 가장 오래 사용하지 않은
+      버킷 제거 (LRU, O(1))
+    - burst보다 큰 요청은 버킷이 가득 찼을 때 허용되고 잔량이 음수(부채)가 됨
+    """
+
+    def __init__(
+        self,
+        tokens_per_second: float,
+        burst_tokens: int,
+        num_shards: int = 16,
+        max_keys_per_shard: int = 4096,
+    ):
+        self.rate = tokens_per_second
+        self.burst = burst_tokens
+        self.max_keys_per_shard = max_keys_per_shard
+        self._shards: List[OrderedDict[str, _Bucket]] = [
+            OrderedDict() for _ in range(num_shards)
+        ]
+
+    def _bucket(self, key: str, now: float) -> _Bucket:
+        shard = self._shards[hash(key) % len(self._shards)]
+        bucket = shard.get(key)
+        if bucket is None:
+            # 샤드당 키 수 상한 (LRU) - 키를 계속 바꾸는 클라이언트에도 메모리 고정
+            if len(shard) >= self.max_keys_per_shard:
+                shard.popitem(last=False)
+            bucket = shard[key] = _Bucket(self.burst, now)
+            return bucket
+
+        shard.move_to_end(key)
+        # 경과 시간만큼 refill
+        elapsed = now - bucket.updated_at
+        if elapsed > 0:
+            bucket.tokens = min(self.burst, bucket.tokens + elapsed * self.rate)
+            bucket.updated_at = now
+        return bucket
+
+    def reserve(
+        self, key: str, tokens: int, now: Optional[float] = None
+    ) -> Reservation:
+        """토큰 예약 (부족하면 RateLimitExceeded)"""
+        now = time.monotonic() if now is None else now
+        bucket = self._bucket(key, now)
+
+        needed = min(tokens, self.burst)
+        if bucket.tokens < needed:
+            record_rate_limit(allowed=False)
+            raise RateLimitExceeded(
+                limit=self.burst,
+                remaining=max(0, int(bucket.tokens)),
+                retry_after=(needed - bucket.tokens) / self.rate,
+            )
+
+        bucket.tokens -= tokens
+        record_rate_limit(allowed=True)
+        return Reservation(key=key, tokens=tokens)
+
+    def settle(
+        self, reservation: Reservation, used_tokens: int, now: Optional[float] = None
+    ) -> None:
+        """
+        실제 사용량 기준으로 예약분 정산
+        - 덜 썼으면 남은 토큰 환불
+        - 예측 기반 예약보다 더 썼으면 초과분 추가 차감 (잔량이 음수가 될 수 있음)
+        """
+        refund = reservation.tokens - used_tokens
+        if refund == 0:
+            return
+        now = time.monotonic() if now is None else now
+        bucket = self._bucket(reservation.key, now)
+        bucket.tokens = min(self.burst, bucket.tokens + refund)
+
+    def remaining(self, key: str, now: Optional[float] = None) -> int:
+        """현재 잔량"""
+        now = time.monotonic() if now is None else now
+        return max(0, int(self._bucket(key, now).tokens))
+
+
+def create_rate_limiter() -> Optional[TokenBucketRateLimiter]:
+    """설정 기반 rate limiter 생성 (비활성화 시 None)"""
+    if not settings.rate_limit_enabled:
+        return None
+    return TokenBucketRateLimiter(
+        tokens_per_second=settings.rate_limit_tokens_per_second,
+        burst_tokens=settings.rate_limit_burst_tokens,
+        num_shards=settings.rate_limit_shards,
+    )
@@ -0,0 +1,110 @@
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+from typing import Dict, List, Optional
+
+from src.config import settings
+from src.models.schemas import ChatRequest, ChatResponse
+
+logger = logging.getLogger(__name__)
+
+PROMPT_MODES = ("raw", "hash", "redact")
+
+
+class TrafficRecorder:
+    """
+    요청 트래픽을 append-only JSONL로 기록 (capacity planning용 replay 입력)
+
+    - 한 줄에 요청 하나: 도착 시각, tenant, 모델, 프롬프트, 토큰 수, max_tokens,
+      latency, outcome
+    - tenant는 API 키(미등록 시 클라이언트 IP)의 HMAC으로만 기록
+    - prompt_mode: raw(원문) / hash(메시지별 HMAC) / redact(길이만)
+
+    hash 모드는 프롬프트를 숨기는 용도가 아니라 같은 프롬프트의 반복을 맞추기
+    위한 것 (salt를 아는 사람은 짧거나 흔한 프롬프트를 사전 대입으로 복원 가능)
+    salt 미설정 시 프로세스마다 임의 salt를 써서 재시작 후에는 digest가 달라짐
+    """
+
+    def __init__(self, path: str, prompt_mode: str = "hash", salt: str = ""):
+        if prompt_mode not in PROMPT_MODES:
+            raise ValueError(f"prompt_mode must be one of {PROMPT_MODES}")
+        self.path = path
+        self.prompt_mode = prompt_mode
+        if salt:
+            self._salt = salt.encode()
+        else:
+            self._salt = secrets.token_bytes(32)
+            logger.warning(
+                "TRAFFIC_CAPTURE_SALT not set: using a random salt, "
+                "digests will not match across restarts"
+            )
+        self._file = open(path, "a", encoding="utf-8", buffering=1 << 16)
+        self.records = 0
+
+    def _digest(self, value: str, length: int = 16) -> str:
+        digest = hmac.new(self._salt, value.encode(), hashlib.sha256)
+        return digest.hexdigest()[:length]
+
+    def _messages(self, request: ChatRequest) -> List[Dict]:
+        messages = []
+        for msg in request.messages:
+            entry = {"role": msg.role.value, "chars": len(msg.content)}
+            if self.prompt_mode == "raw":
+                entry["content"] = msg.content
+            elif self.prompt_mode == "hash":
+                entry["hmac"] = self._digest(msg.content)
+            messages.append(entry)
+        return messages
+
+    def record(
+        self,
+        api_key: str,
+        endpoint: str,
+        request: ChatRequest,
+        arrival: float,
+        latency_ms: float,
+        outcome: str,
+        response: Optional[ChatResponse] = None,
+        batch_id: Optional[str] = None,
+    ) -> None:
+        """요청 하나 기록 (arrival: epoch seconds)"""
+        usage = response.usage if response is not None else {}
+        line = {
+            "ts": round(arrival, 6),
+            "tenant": self._digest(api_key, 12),
+            "endpoint": endpoint,
+            "model": request.model,
+            "messages": self._messages(request),
+            "max_tokens": request.max_tokens,
+            "temperature": request.temperature,
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens"),
+            "latency_ms": round(latency_ms, 3),
+            "outcome": outcome,
+        }
+        if batch_id is not None:
+            line["batch_id"] = batch_id
+
+        try:
+            self._file.write(json.dumps(line, separators=(",", ":")) + "\n")
+            self.records += 1
+        except OSError as e:
+            logger.error(f"Traffic capture write failed: {e}")
+
+    def close(self) -> None:
+        self._file.flush()
+        self._file.close()
+        logger.info(f"Traffic capture closed: {self.records} records → {self.path}")
+
+
+def create_traffic_recorder() -> Optional[TrafficRecorder]:
+    """설정 기반 recorder 생성 (경로 미설정 시 None)"""
+    if not settings.traffic_capture_path:
+        return None
+    return TrafficRecorder(
+        settings.traffic_capture_path,
+        prompt_mode=settings.traffic_capture_prompt_mode,
+        salt=settings.traffic_capture_salt,
+    )
@@ -1,64 +1,193 @@
 import asyncio
 import logging
 import time
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 
 from openai import AsyncOpenAI
 
 from src.api.middleware.metrics import record_vllm_metrics
 from src.config import settings
-from src.models.schemas import ChatRequest, ChatResponse
+from src.models.schemas import (
+    ChatDelta,
+    ChatRequest,
+    ChatResponse,
+    Message,
+    MessageRole,
+)
+from src.services.engine_metrics import EngineMetricsCollector
 
 logger = logging.getLogger(__name__)
 
 
 class VLLMClient:
-    """vLLM 서버와 통신하는 비동기 클라이언트"""
+    """
+    vLLM 서버와 통신하는 비동기 클라이언트
 
-    def __init__(self):
-        self.client = AsyncOpenAI(
-            base_url=f"{settings.vllm_base_url}/v1",
-            api_key=settings.vllm_api_key,
-        )
+    모델을 서빙하는 backend가 여러 개면 engine_metrics의 부하 정보로
+    가장 여유 있는 곳에 전송 (부하 정보가 없으면 round robin)
+    """
+
+    def __init__(self, engine_metrics: Optional[EngineMetricsCollector] = None):
+        self.base_urls = settings.all_base_urls
+        self.backends = {
+            url: AsyncOpenAI(base_url=f"{url}/v1", api_key=settings.vllm_api_key)
+            for url in self.base_urls
+        }
+        self.client = self.backends[self.base_urls[0]]
         self.model = settings.vllm_model
+        self.engine_metrics = engine_metrics
+        self._inflight = {url: 0 for url in self.base_urls}
+        self._next_backend = 0
+
+    def _select_backend(self, model: str) -> str:
+        """요청을 보낼 backend 선택"""
+        base_urls = settings.model_base_urls(model)
+        if len(base_urls) == 1:
+            return base_urls[0]
+
+        if self.engine_metrics is not None:
+            url = self.engine_metrics.least_loaded(base_urls, self._inflight)
+            if url is not None:
+                return url
+
+        url = base_urls[self._next_backend % len(base_urls)]
+        self._next_backend += 1
+        return url
 
     async def chat_completion(
-        self, request: ChatRequest, request_id: Optional[str] = None
+        self,
+        request: ChatRequest,
+        request_id: Optional[str] = None,
+        backend: Optional[str] = None,
     ) -> ChatResponse:
         """단일 채팅 요청 처리"""
+        responses = await self.chat_completion_n(
+            request, n=1, request_id=request_id, backend=backend
+        )
+        return responses[0]
+
+    async def chat_completion_n(
+        self,
+        request: ChatRequest,
+        n: int,
+        request_id: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> List[ChatResponse]:
+        """
+        동일 프롬프트에 대해 n개의 choice를 한 번의 요청으로 생성
+        - 프롬프트 prefill은 한 번만 수행됨
+        - usage의 completion_tokens는 choice별로 균등 분배
+        - backend 지정 시 라우팅 없이 해당 backend로 전송 (warmup용)
+        """
         start_time = time.perf_counter()
+        model = request.model or self.model
+        backend = backend or self._select_backend(model)
+        self._inflight[backend] += 1
 
         try:
-            completion = await self.client.chat.completions.create(
-                model=self.model,
+            completion = await self.backends[backend].chat.completions.create(
+                model=model,
                 messages=[msg.model_dump() for msg in request.messages],
                 max_tokens=request.max_tokens,
                 temperature=request.temperature,
+                n=n,
                 stream=False,
             )
 
             latency_ms = (time.perf_counter() - start_time) * 1000
 
             # 📊 메트릭 기록 - 성공
-            record_vllm_metrics(success=True, latency_seconds=latency_ms / 1000)
-
-            return ChatResponse(
-                id=request_id or completion.id,
-                response=completion.choices[0].message.content,
-                model=completion.model,
-                usage=completion.usage.model_dump(exclude_none=True),
-                latency_ms=latency_ms,
+            record_vllm_metrics(
+                model=model, success=True, latency_seconds=latency_ms / 1000
             )
 
+            usage = completion.usage.model_dump(exclude_none=True)
+            choices = sorted(completion.choices, key=lambda c: c.index)
+            base_id = request_id or completion.id
+
+            responses = []
+            for i, choice in enumerate(choices):
+                responses.append(
+                    ChatResponse(
+                        id=base_id if n == 1 else f"{base_id}-{i}",
+                        response=choice.message.content,
+                        model=completion.model,
+                        usage=usage if n == 1 else _split_usage(usage, n, i),
+                        latency_ms=latency_ms,
+                        finish_reason=choice.finish_reason,
+                    )
+                )
+            return responses
+
         except Exception as e:
             latency_ms = (time.perf_counter() - start_time) * 1000
 
             # 📊 메트릭 기록 - 실패
-            record_vllm_metrics(success=False, latency_seconds=latency_ms / 1000)
+            record_vllm_metrics(
+                model=model, success=False, latency_seconds=latency_ms / 1000
+            )
 
             logger.error(f"vLLM request failed: {e}")
             raise
 
+        finally:
+            self._inflight[backend] -= 1
+
+    async def chat_completion_stream(
+        self, request: ChatRequest
+    ) -> AsyncIterator[ChatDelta]:
+        """
+        스트리밍 채팅 요청 - 토큰 조각이 도착하는 대로 전달
+        - 소비자가 중간에 멈추면(aclose/취소) upstream 연결을 닫아 vLLM이 생성 중단
+        - 소비자가 느리면 다음 조각을 읽지 않으므로 TCP 수준에서 backpressure
+        """
+        start_time = time.perf_counter()
+        model = request.model or self.model
+        backend = self._select_backend(model)
+        self._inflight[backend] += 1
+        stream = None
+
+        try:
+            stream = await self.backends[backend].chat.completions.create(
+                model=model,
+                messages=[msg.model_dump() for msg in request.messages],
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            finish_reason = None
+            usage: Dict[str, int] = {}
+            async for chunk in stream:
+                if chunk.choices:
+                    choice = chunk.choices[0]
+                    finish_reason = choice.finish_reason or finish_reason
+                    if choice.delta.content:
+                        yield ChatDelta(content=choice.delta.content)
+                if chunk.usage is not None:
+                    usage = chunk.usage.model_dump(exclude_none=True)
+            yield ChatDelta(finish_reason=finish_reason, usage=usage)
+
+            record_vllm_metrics(
+                model=model,
+                success=True,
+                latency_seconds=time.perf_counter() - start_time,
+            )
+
+        except Exception as e:
+            record_vllm_metrics(
+                model=model,
+                success=False,
+                latency_seconds=time.perf_counter() - start_time,
+            )
+            logger.error(f"vLLM stream failed: {e}")
+            raise
+
+        finally:
+            if stream is not None:
+                await stream.close()
+            self._inflight[backend] -= 1
+
     async def batch_chat_completion(
         self, requests: List[ChatRequest]
     ) -> List[ChatResponse]:
@@ -92,11 +221,69 @@ class VLLMClient:
 
         return valid_responses
 
-    async def health_check(self) -> bool:
-        """vLLM 서버 상태 확인"""
-        try:
-            response = await self.client.models.list()
-            return len(response.data) > 0
-        except Exception as e:
-            logger.error(f"Health check failed: {e}")
+    async def warmup(self) -> bool:
+        """
+        서빙 시작 전 예열
+        - 모든 모델의 모든 backend에 동시 요청으로 커넥션 풀의 연결을 미리 생성
+          (cascade fast 모델 등 별도 backend도 포함)
+        - warmup 프롬프트로 vLLM 첫 요청 지연 제거
+        """
+        message = Message(role=MessageRole.USER, content=settings.warmup_prompt)
+        targets = [
+            (model, url)
+            for model in settings.available_models
+            for url in settings.model_base_urls(model)
+        ]
+
+        start_time = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                self.chat_completion(
+                    ChatRequest(
+                        messages=[message],
+                        max_tokens=settings.warmup_max_tokens,
+                        temperature=0.0,
+                        model=model,
+                    ),
+                    request_id=f"warmup_{i}",
+                    backend=url,
+                )
+                for model, url in targets
+                for i in range(settings.warmup_concurrency)
+            ),
+            return_exceptions=True,
+        )
+        total_time = (time.perf_counter() - start_time) * 1000
+
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.warning(f"Warmup failed: {failed[0]}")
             return False
+
+        logger.info(f"Warmup completed: {len(results)} requests in {total_time:.2f}ms")
+        return True
+
+    async def health_check(self) -> bool:
+        """vLLM 서버 상태 확인 (backend 하나라도 응답하면 True)"""
+        for url, client in self.backends.items():
+            try:
+                response = await client.models.list()
+                if len(response.data) > 0:
+                    return True
+            except Exception as e:
+                logger.error(f"Health check failed for {url}: {e}")
+        return False
+
+
+def _split_usage(usage: Dict[str, int], n: int, index: int) -> Dict[str, int]:
+    """n-choice 응답의 usage를 choice 하나 몫으로 분배"""
+    prompt_tokens = usage.get("prompt_tokens", 0)
+    completion_total = usage.get("completion_tokens", 0)
+    completion_tokens = completion_total // n + (
+        1 if index < completion_total % n else 0
+    )
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
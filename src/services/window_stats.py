@@ -0,0 +1,187 @@
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 조회 윈도우 (라벨, 초)
+DEFAULT_WINDOWS = (("1m", 60.0), ("5m", 300.0), ("15m", 900.0))
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+# 히스토그램 구간 비율 (구간 대표값의 상대 오차 약 1%)
+GAMMA = 1.02
+_LOG_GAMMA = math.log(GAMMA)
+MIN_VALUE = 1e-6  # 이하 값은 0 구간으로 기록
+_ZERO_BIN = -(1 << 31)
+
+
+def bin_index(value: float) -> int:
+    """값이 속한 로그 구간 (gamma^(i-1), gamma^i]"""
+    if value <= MIN_VALUE:
+        return _ZERO_BIN
+    return math.ceil(math.log(value) / _LOG_GAMMA)
+
+
+def bin_value(index: int) -> float:
+    """구간 대표값 (상대 오차가 최소가 되는 지점)"""
+    if index == _ZERO_BIN:
+        return 0.0
+    return 2 * GAMMA**index / (GAMMA + 1)
+
+
+class TimeBucketedHistogram:
+    """
+    시간 구간별 로그 히스토그램 링
+
+    - bucket_seconds 단위 구간마다 히스토그램(구간 index → count)과 max를 가짐
+    - 구간 수가 고정(가장 긴 윈도우 / bucket_seconds + 1)이라 요청률과 무관하게
+      메모리 고정, 윈도우는 실제 시간 범위 전체를 반영
+    - 기록은 O(1), 새 구간에 들어서면 가장 오래된 구간을 재사용
+    - 백분위수는 구간 대표값 (상대 오차 약 1%), max는 정확한 값
+    """
+
+    __slots__ = (
+        "_bucket_seconds",
+        "_epochs",
+        "_counts",
+        "_maxes",
+        "_cache_key",
+        "_cache",
+    )
+
+    def __init__(self, bucket_seconds: float, max_window_seconds: float):
+        if bucket_seconds <= 0:
+            raise ValueError("bucket_seconds must be positive")
+        size = math.ceil(max_window_seconds / bucket_seconds) + 1
+        self._bucket_seconds = bucket_seconds
+        self._epochs = [-1] * size
+        self._counts: List[Dict[int, int]] = [{} for _ in range(size)]
+        self._maxes = [0.0] * size
+        self._cache_key: Optional[Tuple] = None
+        self._cache: Dict[str, Tuple[Dict[int, int], float]] = {}
+
+    def append(self, value: float, now: Optional[float] = None) -> None:
+        """샘플 기록"""
+        epoch = int((time.monotonic() if now is None else now) // self._bucket_seconds)
+        i = epoch % len(self._epochs)
+        counts = self._counts[i]
+        if self._epochs[i] != epoch:
+            self._epochs[i] = epoch
+            counts.clear()
+            self._maxes[i] = value
+        elif value > self._maxes[i]:
+            self._maxes[i] = value
+        index = bin_index(value)
+        counts[index] = counts.get(index, 0) + 1
+
+    def windows(
+        self, windows: Iterable[Tuple[str, float]], now: Optional[float] = None
+    ) -> Dict[str, Tuple[Dict[int, int], float]]:
+        """
+        윈도우별 (병합 히스토그램, max)
+
+        윈도우는 현재 구간을 포함한 최근 ceil(seconds / bucket_seconds)개 구간
+        (현재 구간이 진행 중이므로 실제 범위는 seconds - bucket_seconds 초과 ~ seconds)
+        지난 구간들의 병합 결과는 현재 구간이 바뀔 때까지 캐시 (기록은 항상 현재 구간)
+        """
+        current = int(
+            (time.monotonic() if now is None else now) // self._bucket_seconds
+        )
+        targets = tuple(
+            sorted(
+                (math.ceil(seconds / self._bucket_seconds), label)
+                for label, seconds in windows
+            )
+        )
+        if self._cache_key != (current, targets):
+            self._cache_key = (current, targets)
+            self._cache = self._merge_past(current, targets)
+
+        i = current % len(self._epochs)
+        fresh = self._epochs[i] == current
+        result = {}
+        for label, (past, past_peak) in self._cache.items():
+            merged = dict(past)
+            peak = past_peak
+            if fresh:
+                for index, count in self._counts[i].items():
+                    merged[index] = merged.get(index, 0) + count
+                peak = max(peak, self._maxes[i])
+            result[label] = (merged, peak)
+        return result
+
+    def _merge_past(
+        self, current: int, targets: Tuple[Tuple[int, str], ...]
+    ) -> Dict[str, Tuple[Dict[int, int], float]]:
+        """현재 구간을 제외한 윈도우별 병합 (최신 구간부터 누적)"""
+        merged: Dict[int, int] = {}
+        peak = 0.0
+        result = {}
+        age = 1
+        for span, label in targets:
+            while age < span:
+                epoch = current - age
+                i = epoch % len(self._epochs)
+                if self._epochs[i] == epoch:
+                    for index, count in self._counts[i].items():
+                        merged[index] = merged.get(index, 0) + count
+                    peak = max(peak, self._maxes[i])
+                age += 1
+            result[label] = (dict(merged), peak)
+        return result
+
+
+def summarize(
+    counts: Dict[int, int],
+    peak: float,
+    percentiles: Iterable[int] = DEFAULT_PERCENTILES,
+) -> Dict[str, float]:
+    """히스토그램의 count / nearest-rank 백분위수 / max 요약"""
+    total = sum(counts.values())
+    summary: Dict[str, float] = {"count": total}
+    ranks = [(max(1, math.ceil(total * p / 100)), f"p{p}") for p in percentiles]
+    # 누적 count를 한 번 훑으며 각 백분위수 rank에 도달한 구간 선택
+    pending = iter(sorted(ranks))
+    rank, key = next(pending, (None, None))
+    seen = 0
+    for index in sorted(counts) if total else ():
+        seen += counts[index]
+        while rank is not None and seen >= rank:
+            summary[key] = min(bin_value(index), peak)
+            rank, key = next(pending, (None, None))
+        if rank is None:
+            break
+    for _, key in ranks:
+        summary.setdefault(key, 0.0)
+    summary["max"] = peak if total else 0.0
+    return summary
+
+
+class WindowedStats:
+    """이름별 시간 구간 히스토그램 묶음 - 슬라이딩 윈도우 백분위수 조회"""
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        bucket_seconds: float,
+        windows=DEFAULT_WINDOWS,
+    ):
+        self.windows = tuple(windows)
+        max_window = max(seconds for _, seconds in self.windows)
+        self._histograms = {
+            name: TimeBucketedHistogram(bucket_seconds, max_window) for name in names
+        }
+
+    def record(self, name: str, value: float, now: Optional[float] = None) -> None:
+        self._histograms[name].append(value, now)
+
+    def snapshot(
+        self, now: Optional[float] = None
+    ) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """윈도우별, 지표별 요약"""
+        now = time.monotonic() if now is None else now
+        snapshot: Dict[str, Dict[str, Dict[str, float]]] = {
+            label: {} for label, _ in self.windows
+        }
+        for name, histogram in self._histograms.items():
+            for label, (counts, peak) in histogram.windows(self.windows, now).items():
+                snapshot[label][name] = summarize(counts, peak)
+        return snapshot
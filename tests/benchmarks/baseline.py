@@ -0,0 +1,31 @@
+"""벤치마크 결과의 baseline 대비 회귀 확인 (startup_performance, hot_path 공용)"""
+
+from typing import Callable, Dict, Optional
+
+
+def compare_with_baseline(
+    results: Dict[str, Optional[float]],
+    baseline: Dict[str, float],
+    threshold: float,
+    fmt: Callable[[float], str] = "{:10.1f}".format,
+    width: int = 40,
+) -> bool:
+    """baseline 대비 threshold 이상 비용이 늘어난 항목 확인 (낮을수록 좋은 지표)"""
+    print("\n" + "=" * 60)
+    print(f"BASELINE COMPARISON (threshold: +{threshold * 100:.0f}%)")
+    print("=" * 60)
+
+    ok = True
+    for name, value in results.items():
+        base = baseline.get(name)
+        if value is None or not base:
+            continue
+        change = value / base - 1
+        regressed = change > threshold
+        ok = ok and not regressed
+        mark = "❌ REGRESSION" if regressed else "✅"
+        print(
+            f"{name:>{width}}: {fmt(base)} → {fmt(value)} ({change * 100:+.1f}%) {mark}"
+        )
+
+    return ok
@@ -0,0 +1,136 @@
+"""
+CPU 오프로딩 벤치마크
+- 대용량 배치 요청(수 MB)을 파싱/직렬화하는 동안 interactive 요청 latency 측정
+- 오프로딩 비활성화 vs 활성화 비교 (vLLM 대신 지연 없는 가짜 클라이언트 사용)
+
+사용법:
+    python -m tests.benchmarks.event_loop_offload --batch-items 5000 --batches 4
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from src.api.main import app
+from src.api.middleware.metrics import cpu_offload_tasks_total
+from src.config import settings
+from src.services.batch_handler import BatchHandler
+from src.services.cpu_offload import EventLoopLagMonitor
+from tests.benchmarks.fake_client import FakeVLLMClient
+
+INTERACTIVE_BODY = {
+    "messages": [{"role": "user", "content": "Hi"}],
+    "max_tokens": 16,
+}
+
+
+def build_batch_body(items: int) -> bytes:
+    """약 1KB 프롬프트 items개로 구성된 배치 본문"""
+    request = {
+        "messages": [{"role": "user", "content": "lorem ipsum " * 85}],
+        "max_tokens": 64,
+    }
+    return json.dumps({"requests": [request] * items}).encode()
+
+
+async def interactive_loop(client: httpx.AsyncClient, stop: asyncio.Event):
+    """대용량 배치 처리 중 단일 요청 latency 측정"""
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.post("/api/v1/chat", json=INTERACTIVE_BODY)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+def offloaded_tasks() -> float:
+    """worker 스레드에서 실행된 배치 파싱 수"""
+    return cpu_offload_tasks_total.labels(task="parse_batch")._value.get()
+
+
+async def run_scenario(name: str, offload_min_bytes: int, body: bytes, batches: int):
+    print(f"\n=== {name} ===")
+    settings.offload_min_bytes = offload_min_bytes
+    offloaded_before = offloaded_tasks()
+
+    monitor = EventLoopLagMonitor(interval_ms=10)
+    monitor.start()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://gateway", timeout=120.0
+    ) as client:
+        stop = asyncio.Event()
+        interactive = asyncio.create_task(interactive_loop(client, stop))
+        await asyncio.sleep(0.2)
+
+        start = time.perf_counter()
+        for _ in range(batches):
+            response = await client.post(
+                "/api/v1/batch/chat",
+                content=body,
+                headers={"content-type": "application/json"},
+            )
+            response.raise_for_status()
+        batch_time = time.perf_counter() - start
+
+        await asyncio.sleep(0.2)
+        stop.set()
+        latencies = await interactive
+    monitor.stop()
+    offloaded = int(offloaded_tasks() - offloaded_before)
+
+    p99 = statistics.quantiles(latencies, n=100)[98]
+    print("\nResults:")
+    print(f"Batch processing time: {batch_time:.2f}s ({batches} batches)")
+    print(f"Interactive requests: {len(latencies)}")
+    print(f"Interactive P50 latency: {statistics.median(latencies) * 1000:.1f}ms")
+    print(f"Interactive P99 latency: {p99 * 1000:.1f}ms")
+    print(f"Max event loop lag: {monitor.max_lag_s * 1000:.1f}ms")
+    print(f"Offloaded batch parses: {offloaded}")
+
+    return p99, offloaded
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="CPU offload benchmark")
+    parser.add_argument("--batch-items", type=int, default=5000)
+    parser.add_argument("--batches", type=int, default=10)
+    args = parser.parse_args()
+
+    client = FakeVLLMClient()
+    app.state.vllm_client = client
+    app.state.batch_handler = BatchHandler(client)
+
+    body = build_batch_body(args.batch_items)
+    print(f"📊 Batch body: {len(body) / 1e6:.1f}MB ({args.batch_items} requests)")
+
+    # 설정된 임계값은 inline 시나리오가 덮어쓰기 전에 보관
+    threshold = settings.offload_min_bytes
+    if len(body) < threshold:
+        parser.error(f"batch body must be at least OFFLOAD_MIN_BYTES ({threshold})")
+    try:
+        inline_p99, inline_offloaded = await run_scenario(
+            "Inline (no offload)", 1 << 62, body, args.batches
+        )
+        offload_p99, offloaded = await run_scenario(
+            "Offload to worker threads", threshold, body, args.batches
+        )
+    finally:
+        settings.offload_min_bytes = threshold
+    assert inline_offloaded == 0, "inline scenario offloaded batch parsing"
+    assert offloaded == args.batches, "offload scenario did not offload parsing"
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    print(f"Interactive P99 inline:  {inline_p99 * 1000:.1f}ms")
+    print(f"Interactive P99 offload: {offload_p99 * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+지연 없는 가짜 vLLM 클라이언트
+- gateway 자체 오버헤드 측정용 (VLLMClient 대체)
+- 가짜 클라이언트 비용이 측정을 가리지 않도록 모델별 응답 객체를 재사용
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+from src.config import settings
+from src.models.schemas import ChatRequest, ChatResponse
+
+USAGE = {"prompt_tokens": 8, "completion_tokens": 8, "total_tokens": 16}
+
+
+class FakeVLLMClient:
+    """VLLMClient와 같은 인터페이스, 즉시 응답"""
+
+    def __init__(self, response_text: str = "ok"):
+        self.model = settings.vllm_model
+        self.response_text = response_text
+        self._responses: Dict[str, ChatResponse] = {}
+
+    def _response(self, request: ChatRequest) -> ChatResponse:
+        model = request.model or self.model
+        response = self._responses.get(model)
+        if response is None:
+            response = self._responses[model] = ChatResponse(
+                id="fake",
+                response=self.response_text,
+                model=model,
+                usage=USAGE,
+                latency_ms=0.0,
+                finish_reason="stop",
+            )
+        return response
+
+    async def chat_completion(
+        self, request: ChatRequest, request_id: Optional[str] = None
+    ) -> ChatResponse:
+        await asyncio.sleep(0)
+        return self._response(request)
+
+    async def chat_completion_n(
+        self, request: ChatRequest, n: int, request_id: Optional[str] = None
+    ) -> List[ChatResponse]:
+        await asyncio.sleep(0)
+        return [self._response(request)] * n
+
+    async def batch_chat_completion(
+        self, requests: List[ChatRequest]
+    ) -> List[ChatResponse]:
+        await asyncio.sleep(0)
+        return [self._response(request) for request in requests]
+
+    async def warmup(self) -> bool:
+        return True
+
+    async def health_check(self) -> bool:
+        return True
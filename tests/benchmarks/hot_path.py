@@ -0,0 +1,424 @@
+"""
+Gateway hot path 마이크로벤치마크
+- vLLM 대신 지연 없는 가짜 클라이언트를 사용해 gateway 자체 오버헤드만 측정
+- 요청당 CPU 시간(us)과 메모리 할당량(bytes, tracemalloc peak) 측정
+    - schema_validation: ChatRequest / 32개 배치 본문 검증
+    - response_encoding: ChatResponse / 32개 배치 응답 JSON 인코딩
+    - metrics_middleware: MetricsMiddleware 유무 차이
+    - batch_handoff: BatchHandler.add_request → _process_batch → future 전달
+    - gateway_chat: /api/v1/chat/batch 전체 경로 (ASGI 직접 호출)
+- batch_handoff, gateway_chat은 1k~50k req/s open-loop 부하에서 측정
+
+사용법:
+    python -m tests.benchmarks.hot_path --output hot_path.json
+    python -m tests.benchmarks.hot_path --baseline hot_path.json
+    python -m tests.benchmarks.hot_path --compare base.json new.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Awaitable, Callable, Dict, List, Union
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.api.main import app
+from src.api.middleware.metrics import MetricsMiddleware
+from src.api.routes.batch import _validate_batch
+from src.config import settings
+from src.models.schemas import BatchChatResponse, ChatRequest
+from src.services.batch_handler import BatchHandler
+from src.services.length_predictor import create_length_predictor
+from src.services.rate_limiter import TokenBucketRateLimiter
+from tests.benchmarks.baseline import compare_with_baseline
+from tests.benchmarks.fake_client import FakeVLLMClient
+
+DEFAULT_RATES = "1000,5000,10000,50000"
+
+CHAT_BODY = {
+    "messages": [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": "Summarize the benefits of batching. " * 4},
+    ],
+    "max_tokens": 64,
+    "temperature": 0.7,
+}
+
+
+# ============================================
+# 측정 헬퍼
+# ============================================
+
+
+def measure_sync(func: Callable[[], object], ops: int, repeats: int) -> Dict:
+    """동기 함수의 호출당 CPU 시간(최소값)과 할당량"""
+    func()  # warmup
+    cpu_ns = []
+    for _ in range(repeats):
+        start = time.process_time_ns()
+        for _ in range(ops):
+            func()
+        cpu_ns.append((time.process_time_ns() - start) / ops)
+
+    tracemalloc.start()
+    peaks = []
+    for _ in range(min(ops, 200)):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        func()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    return {"cpu_us": min(cpu_ns) / 1000, "alloc_bytes": statistics.median(peaks)}
+
+
+async def measure_async(call: Callable[[], Awaitable[object]], ops: int) -> Dict:
+    """비동기 호출을 하나씩 실행해 요청당 CPU 시간과 할당량 측정"""
+    await call()  # warmup
+    start = time.process_time_ns()
+    for _ in range(ops):
+        await call()
+    cpu_us = (time.process_time_ns() - start) / ops / 1000
+
+    tracemalloc.start()
+    peaks = []
+    for _ in range(min(ops, 200)):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        await call()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    return {"cpu_us": cpu_us, "alloc_bytes": statistics.median(peaks)}
+
+
+async def drive_load(
+    call: Callable[[], Awaitable[object]],
+    rate: int,
+    duration_s: float,
+    max_inflight: int,
+) -> Dict:
+    """
+    open-loop 부하: 응답과 무관하게 rate req/s로 요청 시작
+    - 1ms tick마다 밀린 요청을 한꺼번에 시작
+    - 처리량 한계를 넘으면 in-flight가 max_inflight에서 막히고 achieved_rps < rate
+    """
+    latencies: List[float] = []
+
+    async def one():
+        start = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    sent = 0
+    cpu_start = time.process_time_ns()
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < duration_s:
+        due = min(int(elapsed * rate) + 1, len(latencies) + max_inflight)
+        while sent < due:
+            tasks.append(asyncio.create_task(one()))
+            sent += 1
+        await asyncio.sleep(0.001)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    cpu_us = (time.process_time_ns() - cpu_start) / sent / 1000
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "cpu_us": cpu_us,
+        "achieved_rps": sent / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+def asgi_caller(
+    asgi_app, path: str, body: Union[bytes, Callable[[], bytes]] = b"{}"
+) -> Callable[[], Awaitable[int]]:
+    """
+    HTTP 클라이언트 없이 ASGI app을 직접 호출 (클라이언트 비용 제외)
+    (body가 함수면 호출마다 새 본문 생성)
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "client": ("127.0.0.1", 50000),
+        "server": ("gateway", 80),
+    }
+
+    async def call() -> int:
+        sent_body = False
+        status = 0
+        payload = body() if callable(body) else body
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            # 연결 유지 (disconnect 감지 대기는 응답 완료 시 취소됨)
+            await asyncio.get_running_loop().create_future()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        headers = [
+            (b"host", b"gateway"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+        ]
+        await asgi_app({**scope, "headers": headers}, receive, send)
+        if status != 200:
+            raise RuntimeError(f"{path} returned {status}")
+        return status
+
+    return call
+
+
+# ============================================
+# 벤치마크
+# ============================================
+
+
+def bench_schema_validation(ops: int, repeats: int) -> Dict[str, Dict]:
+    chat_body = json.dumps(CHAT_BODY).encode()
+    batch_body = json.dumps({"requests": [CHAT_BODY] * 32}).encode()
+    return {
+        "schema_validation.chat": measure_sync(
+            lambda: ChatRequest.model_validate_json(chat_body), ops, repeats
+        ),
+        "schema_validation.batch32": measure_sync(
+            lambda: _validate_batch(batch_body), max(1, ops // 32), repeats
+        ),
+    }
+
+
+def bench_response_encoding(ops: int, repeats: int) -> Dict[str, Dict]:
+    client = FakeVLLMClient(response_text="Batching amortizes overhead. " * 8)
+    response = client._response(ChatRequest.model_validate(CHAT_BODY))
+    batch = BatchChatResponse(
+        batch_id="bench",
+        responses=[response] * 32,
+        total_latency_ms=1.0,
+        batch_size=32,
+        throughput=32000.0,
+    )
+    return {
+        # response_model 경로 (jsonable_encoder → JSONResponse)
+        "response_encoding.chat": measure_sync(
+            lambda: JSONResponse(jsonable_encoder(response)), ops, repeats
+        ),
+        # /batch/chat 경로 (model_dump_json)
+        "response_encoding.batch32": measure_sync(
+            batch.model_dump_json, max(1, ops // 32), repeats
+        ),
+    }
+
+
+async def bench_metrics_middleware(ops: int) -> Dict[str, Dict]:
+    async def ping():
+        return {"ok": True}
+
+    def build(with_metrics: bool) -> FastAPI:
+        bench_app = FastAPI()
+        bench_app.add_api_route("/ping", ping, methods=["POST"])
+        if with_metrics:
+            bench_app.add_middleware(MetricsMiddleware)
+        return bench_app
+
+    bare = await measure_async(asgi_caller(build(False), "/ping"), ops)
+    wrapped = await measure_async(asgi_caller(build(True), "/ping"), ops)
+    return {
+        "metrics_middleware": {
+            "cpu_us": max(0.0, wrapped["cpu_us"] - bare["cpu_us"]),
+            "alloc_bytes": max(0.0, wrapped["alloc_bytes"] - bare["alloc_bytes"]),
+        }
+    }
+
+
+async def bench_batch_handoff(
+    ops: int, rates: List[int], duration_s: float, max_inflight: int
+) -> Dict[str, Dict]:
+    handler = BatchHandler(FakeVLLMClient())
+    counter = 0
+
+    async def call():
+        # 요청마다 내용을 바꿔 fan-out 병합 없이 기본 경로 측정
+        nonlocal counter
+        counter += 1
+        request = ChatRequest(
+            messages=[{"role": "user", "content": f"request {counter}"}],
+            max_tokens=64,
+        )
+        return await handler.add_request(request)
+
+    results = {"batch_handoff": await measure_async(call, min(ops, 50))}
+    for rate in rates:
+        results[f"batch_handoff@{rate}"] = await drive_load(
+            call, rate, duration_s, max_inflight
+        )
+    return results
+
+
+async def bench_gateway_chat(
+    ops: int, rates: List[int], duration_s: float, max_inflight: int
+) -> Dict[str, Dict]:
+    client = FakeVLLMClient()
+    app.state.vllm_client = client
+    app.state.length_predictor = create_length_predictor()
+    app.state.batch_handler = BatchHandler(
+        client, length_predictor=app.state.length_predictor
+    )
+    # 단일 클라이언트 IP에서 부하가 몰리므로 사실상 무제한 limiter (비용은 포함)
+    app.state.rate_limiter = TokenBucketRateLimiter(
+        tokens_per_second=1e12, burst_tokens=1 << 60
+    )
+
+    # 요청마다 프롬프트를 바꿔 n=k fan-out 병합 없이 기본 경로 측정 (batch_handoff처럼)
+    prefix, suffix = json.dumps(CHAT_BODY).encode().split(b"batching.", 1)
+    counter = 0
+
+    def body() -> bytes:
+        nonlocal counter
+        counter += 1
+        return b"%sbatching %d.%s" % (prefix, counter, suffix)
+
+    call = asgi_caller(app, "/api/v1/chat/batch", body)
+    results = {"gateway_chat": await measure_async(call, min(ops, 50))}
+    for rate in rates:
+        results[f"gateway_chat@{rate}"] = await drive_load(
+            call, rate, duration_s, max_inflight
+        )
+    return results
+
+
+def flatten(results: Dict[str, Dict]) -> Dict[str, float]:
+    """baseline 비교 대상: 요청당 비용 지표만 (낮을수록 좋음)"""
+    return {
+        f"{name}.{metric}": value
+        for name, metrics in results.items()
+        for metric, value in metrics.items()
+        if metric in ("cpu_us", "alloc_bytes")
+    }
+
+
+# ============================================
+# 출력 / baseline 비교
+# ============================================
+
+
+def print_results(results: Dict[str, Dict]):
+    print("\n" + "=" * 60)
+    print("RESULTS (per request)")
+    print("=" * 60)
+    for name, metrics in results.items():
+        line = f"{name:>28}: CPU {metrics['cpu_us']:8.1f}us"
+        if "alloc_bytes" in metrics:
+            line += f"  alloc {metrics['alloc_bytes'] / 1024:7.1f}KB"
+        if "achieved_rps" in metrics:
+            line += (
+                f"  {metrics['achieved_rps']:8.0f} req/s"
+                f"  P50 {metrics['p50_ms']:7.1f}ms  P99 {metrics['p99_ms']:7.1f}ms"
+            )
+        print(line)
+
+
+def load_baseline(path: str) -> Dict[str, float]:
+    with open(path) as f:
+        return json.load(f)["baseline"]
+
+
+async def run(args) -> Dict[str, Dict]:
+    rates = [int(rate) for rate in args.rates.split(",") if rate]
+
+    print("\n=== Schema validation ===")
+    results = bench_schema_validation(args.ops, args.repeats)
+    print("=== Response encoding ===")
+    results.update(bench_response_encoding(args.ops, args.repeats))
+    print("=== MetricsMiddleware ===")
+    results.update(await bench_metrics_middleware(args.ops))
+    print(f"=== BatchHandler handoff (rates: {rates}) ===")
+    results.update(
+        await bench_batch_handoff(args.ops, rates, args.duration, args.max_inflight)
+    )
+    print(f"=== Gateway /chat/batch (rates: {rates}) ===")
+    results.update(
+        await bench_gateway_chat(args.ops, rates, args.duration, args.max_inflight)
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gateway hot path microbenchmarks")
+    parser.add_argument("--ops", type=int, default=2000, help="측정당 호출 횟수")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--rates", default=DEFAULT_RATES, help="부하 req/s 목록")
+    parser.add_argument("--duration", type=float, default=1.0, help="부하별 시간(s)")
+    parser.add_argument("--max-inflight", type=int, default=2000)
+    parser.add_argument("--batch-timeout-ms", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 baseline JSON 경로")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CURRENT"),
+        help="측정 없이 저장된 두 결과 비교",
+    )
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, current = (load_baseline(path) for path in args.compare)
+        if not compare_with_baseline(current, baseline, args.threshold):
+            sys.exit(1)
+        return
+
+    # 요청/배치마다 찍히는 INFO 로그 출력 제외
+    logging.disable(logging.INFO)
+    # 배치 대기 시간(기본 100ms) 동안은 처리량이 max_batch_size로 묶이므로
+    # 대기 없이 handoff 비용만 측정
+    settings.batch_timeout_ms = args.batch_timeout_ms
+
+    results = asyncio.run(run(args))
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                    "baseline": flatten(results),
+                },
+                f,
+                indent=2,
+            )
+        print(f"\n💾 Saved results to {args.output}")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if not compare_with_baseline(flatten(results), baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+로컬 mock vLLM 서버 (OpenAI 호환 API)
+- GPU 없이 gateway를 구동하기 위한 stand-in
+- 응답 지연 = ttft + completion_tokens * tpot
+- max_num_seqs개까지만 동시에 처리 (vLLM 엔진 슬롯 모사)
+- completion_tokens는 항상 max_tokens (ignore_eos와 동일)
+- stream=True: SSE로 tpot마다 토큰 전송, 클라이언트가 끊으면 생성 중단(aborted 집계)
+- /metrics: vLLM과 같은 이름의 running / waiting / KV cache 지표
+
+사용법:
+    python -m tests.benchmarks.mock_vllm --port 8000 --ttft-ms 50 --tpot-ms 10
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+MODEL = "mock-model"
+
+
+def create_app(
+    ttft_ms: float = 50.0, tpot_ms: float = 10.0, max_num_seqs: int = 32
+) -> FastAPI:
+    """mock vLLM 앱 생성"""
+    app = FastAPI(title="Mock vLLM")
+    slots = asyncio.Semaphore(max_num_seqs)
+    state = {"running": 0, "waiting": 0, "aborted": 0}
+    app.state.engine = state
+
+    async def stream_completion(body: dict, completion_tokens: int, usage: dict):
+        """SSE 스트리밍 응답 (OpenAI chat.completion.chunk 형식)"""
+        chunk = {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", MODEL),
+        }
+
+        def event(choices, **extra) -> str:
+            return f"data: {json.dumps({**chunk, 'choices': choices, **extra})}\n\n"
+
+        state["waiting"] += 1
+        async with slots:
+            state["waiting"] -= 1
+            state["running"] += 1
+            try:
+                await asyncio.sleep(ttft_ms / 1000)
+                for i in range(completion_tokens):
+                    if i:
+                        await asyncio.sleep(tpot_ms / 1000)
+                    delta = {"index": 0, "delta": {"content": "tok "}}
+                    if i == completion_tokens - 1:
+                        delta["finish_reason"] = "length"
+                    yield event([delta])
+            except asyncio.CancelledError:
+                state["aborted"] += 1
+                raise
+            finally:
+                state["running"] -= 1
+
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield event([], usage=usage)
+        yield "data: [DONE]\n\n"
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": MODEL, "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: dict):
+        n = body.get("n") or 1
+        completion_tokens = body.get("max_tokens") or 16
+        prompt_tokens = sum(
+            len(m.get("content", "")) // 4 + 1 for m in body.get("messages", [])
+        )
+        if body.get("stream"):
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+            return StreamingResponse(
+                stream_completion(body, completion_tokens, usage),
+                media_type="text/event-stream",
+            )
+
+        state["waiting"] += 1
+        async with slots:
+            state["waiting"] -= 1
+            state["running"] += 1
+            try:
+                await asyncio.sleep((ttft_ms + completion_tokens * tpot_ms) / 1000)
+            finally:
+                state["running"] -= 1
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", MODEL),
+            "choices": [
+                {
+                    "index": i,
+                    "message": {
+                        "role": "assistant",
+                        "content": "tok " * completion_tokens,
+                    },
+                    "finish_reason": "length",
+                }
+                for i in range(n)
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens * n,
+                "total_tokens": prompt_tokens + completion_tokens * n,
+            },
+        }
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        labels = f'{{model_name="{MODEL}"}}'
+        kv_cache_usage = state["running"] / max_num_seqs
+        return (
+            "# TYPE vllm:num_requests_running gauge\n"
+            f"vllm:num_requests_running{labels} {state['running']}\n"
+            "# TYPE vllm:num_requests_waiting gauge\n"
+            f"vllm:num_requests_waiting{labels} {state['waiting']}\n"
+            "# TYPE vllm:kv_cache_usage_perc gauge\n"
+            f"vllm:kv_cache_usage_perc{labels} {kv_cache_usage}\n"
+        )
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock vLLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--ttft-ms", type=float, default=50.0)
+    parser.add_argument("--tpot-ms", type=float, default=10.0)
+    parser.add_argument("--max-num-seqs", type=int, default=32)
+    args = parser.parse_args()
+
+    app = create_app(args.ttft_ms, args.tpot_ms, args.max_num_seqs)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Cold start 벤치마크
+- import 시간: 새 프로세스에서 `src.api.main` import 소요 시간
+- startup 시간: lifespan 시작부터 warmup 완료(/ready 활성화)까지 소요 시간
+
+사용법:
+    python -m tests.benchmarks.startup_performance --output startup.json
+    python -m tests.benchmarks.startup_performance --baseline startup.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from tests.benchmarks.baseline import compare_with_baseline
+
+IMPORT_SNIPPET = (
+    "import time; s = time.perf_counter(); import src.api.main; "
+    "print(time.perf_counter() - s)"
+)
+
+
+def benchmark_import_time(runs: int):
+    """새 인터프리터에서 앱 모듈 import 시간 측정"""
+    print(f"\n=== Import Time Benchmark (n={runs}) ===")
+
+    durations = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        durations.append(float(result.stdout.strip().splitlines()[-1]))
+
+    print("\nResults:")
+    print(f"P50 import time: {statistics.median(durations) * 1000:.1f}ms")
+    print(f"Max import time: {max(durations) * 1000:.1f}ms")
+
+    return statistics.median(durations)
+
+
+async def benchmark_startup_time(timeout_s: float):
+    """lifespan 시작부터 readiness 활성화까지 소요 시간 측정"""
+    print("\n=== Startup (warmup → ready) Benchmark ===")
+
+    from src.api.main import app
+
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        while not app.state.ready:
+            if time.perf_counter() - start > timeout_s:
+                print("❌ Not ready within timeout (vLLM server available?)")
+                return None
+            await asyncio.sleep(0.01)
+        total_time = time.perf_counter() - start
+
+    print("\nResults:")
+    print(f"Time to ready: {total_time * 1000:.1f}ms")
+
+    return total_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--skip-startup", action="store_true")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 baseline JSON 경로")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {"import_time": benchmark_import_time(args.runs)}
+    if not args.skip_startup:
+        results["startup_time"] = asyncio.run(
+            benchmark_startup_time(args.startup_timeout)
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Saved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare_with_baseline(
+            results,
+            baseline,
+            args.threshold,
+            fmt=lambda seconds: f"{seconds * 1000:8.1f}ms",
+            width=16,
+        ):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+트래픽 replay 벤치마크
+- TRAFFIC_CAPTURE_PATH로 기록한 JSONL을 원래 도착 간격대로 재전송 (1x ~ Nx 속도)
+- 배치 설정(BATCH_MAX_SIZE, BATCH_TIMEOUT_MS 등)을 실제 트래픽 형태로 튜닝하기 위함
+
+사용법:
+    # 1. mock vLLM + gateway 실행
+    python -m tests.benchmarks.mock_vllm --port 8000
+    VLLM_BASE_URL=http://127.0.0.1:8000 VLLM_API_KEY=EMPTY \\
+        uvicorn src.api.main:app --port 8080
+
+    # 2. replay
+    python -m tests.benchmarks.traffic_replay trace.jsonl --speed 4
+
+tenant별 rate limit을 재현하려면 trace의 tenant 값을 gateway의
+RATE_LIMIT_API_KEYS에 등록 (미등록 키는 모두 replay 클라이언트 IP 하나로 제한됨)
+
+/chat/ws 기록은 WebSocket으로 재전송 (기록마다 연결 하나, 스트림 하나)
+- trace에 연결 정보가 없어 원래 한 연결에 다중화된 스트림도 각각 연결을 엶
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter, defaultdict
+
+import httpx
+import websockets
+
+WS_ENDPOINT = "/chat/ws"
+
+
+def load_trace(path: str, limit: int = 0):
+    """트래픽 로그 로드 → 전송 단위(단일 요청 또는 배치) 목록"""
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    records.sort(key=lambda r: r["ts"])
+
+    units = []
+    batches = {}
+    for index, record in enumerate(records):
+        record["index"] = index
+        batch_id = record.get("batch_id")
+        if batch_id is None:
+            units.append({"ts": record["ts"], "records": [record]})
+        elif batch_id in batches:
+            batches[batch_id]["records"].append(record)
+        else:
+            batches[batch_id] = {"ts": record["ts"], "records": [record]}
+            units.append(batches[batch_id])
+
+    return units[:limit] if limit else units
+
+
+def filler(message: dict, record: dict) -> str:
+    """
+    원문이 없는 메시지를 같은 길이의 텍스트로 대체
+    - hash 모드: HMAC digest로 시드 → 같은 프롬프트는 같은 텍스트 (병합 재현)
+    - redact 모드: 기록 순번으로 시드 → 모든 프롬프트를 서로 다르게
+    (같은 텍스트로 채우면 gateway의 동일 요청 병합이 실제보다 많이 일어남)
+    """
+    seed = message.get("hmac") or f"r{record.get('index', 0)}"
+    text = f"{seed} " + "lorem " * (message["chars"] // 6 + 1)
+    return text[: max(1, message["chars"])]
+
+
+def build_request(record: dict, exact_output: bool) -> dict:
+    """기록으로부터 ChatRequest 본문 재구성 (원문이 없으면 같은 길이의 텍스트)"""
+    messages = [
+        {"role": m["role"], "content": m.get("content") or filler(m, record)}
+        for m in record["messages"]
+    ]
+
+    # mock vLLM은 max_tokens만큼 생성하므로 실제 출력 길이를 재현
+    max_tokens = record["max_tokens"]
+    if exact_output and record.get("completion_tokens"):
+        max_tokens = record["completion_tokens"]
+
+    body = {
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": record.get("temperature", 0.7),
+    }
+    if record.get("model"):
+        body["model"] = record["model"]
+    return body
+
+
+async def stream_chat(websocket, record: dict, exact_output: bool) -> int:
+    """
+    WebSocket 스트림 하나 전송 후 완료까지 수신, HTTP 상태 코드로 환산
+    (done → 200, error → 메시지의 status)
+    """
+    stream_id = f"r{record.get('index', 0)}"
+    request = build_request(record, exact_output)
+    await websocket.send(
+        json.dumps({"type": "chat", "id": stream_id, "request": request})
+    )
+    while True:
+        message = json.loads(await websocket.recv())
+        if message.get("id") not in (stream_id, None):
+            continue
+        if message["type"] == "done":
+            return 200
+        if message["type"] == "error":
+            return message.get("status", 0)
+
+
+def websocket_url(base_url: str) -> str:
+    """gateway HTTP 주소 → /chat/ws 주소"""
+    url = base_url.rstrip("/").replace("http", "ws", 1)
+    return f"{url}/api/v1{WS_ENDPOINT}"
+
+
+async def send_unit(client: httpx.AsyncClient, unit: dict, exact_output: bool):
+    """전송 단위 하나 전송 후 (endpoint, status, latency) 반환"""
+    first = unit["records"][0]
+    endpoint = first["endpoint"]
+    start = time.perf_counter()
+    if endpoint == WS_ENDPOINT:
+        try:
+            async with websockets.connect(
+                websocket_url(str(client.base_url)),
+                additional_headers={"X-API-Key": first["tenant"]},
+            ) as websocket:
+                status = await stream_chat(websocket, first, exact_output)
+        except (OSError, websockets.WebSocketException):
+            status = 0
+        return endpoint, status, time.perf_counter() - start, 1
+
+    bodies = [build_request(r, exact_output) for r in unit["records"]]
+    body = {"requests": bodies} if endpoint == "/batch/chat" else bodies[0]
+    try:
+        response = await client.post(
+            f"/api/v1{endpoint}", json=body, headers={"X-API-Key": first["tenant"]}
+        )
+        status = response.status_code
+    except httpx.HTTPError:
+        status = 0
+    return endpoint, status, time.perf_counter() - start, len(bodies)
+
+
+async def replay(units, gateway: str, speed: float, exact_output: bool):
+    """원래 도착 간격 / speed 로 재전송"""
+    print(f"\n=== Traffic Replay (units={len(units)}, speed={speed}x) ===")
+
+    t0 = units[0]["ts"]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=256)
+    async with httpx.AsyncClient(
+        base_url=gateway, timeout=300.0, limits=limits
+    ) as client:
+        start = time.perf_counter()
+        tasks = []
+        for unit in units:
+            delay = (unit["ts"] - t0) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send_unit(client, unit, exact_output)))
+
+        results = await asyncio.gather(*tasks)
+        total_time = time.perf_counter() - start
+
+    return results, total_time
+
+
+def quantile(values, q: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q * 100) - 1]
+
+
+def build_report(units, results, total_time: float) -> dict:
+    """latency / throughput 리포트"""
+    by_endpoint = defaultdict(list)
+    statuses = Counter()
+    requests_sent = 0
+    for endpoint, status, latency, n in results:
+        statuses[status] += 1
+        requests_sent += n
+        if status == 200:
+            by_endpoint[endpoint].append(latency)
+
+    recorded = [r["latency_ms"] / 1000 for u in units for r in u["records"]]
+    trace_span = units[-1]["ts"] - units[0]["ts"]
+
+    return {
+        "units": len(results),
+        "requests": requests_sent,
+        "total_time_s": total_time,
+        "trace_span_s": trace_span,
+        "throughput_req_s": requests_sent / total_time if total_time else 0.0,
+        "status_counts": {str(k): v for k, v in statuses.items()},
+        "latency_s": {
+            endpoint: {
+                "count": len(latencies),
+                "p50": quantile(latencies, 0.50),
+                "p95": quantile(latencies, 0.95),
+                "p99": quantile(latencies, 0.99),
+            }
+            for endpoint, latencies in by_endpoint.items()
+        },
+        "recorded_latency_s": {
+            "p50": quantile(recorded, 0.50),
+            "p99": quantile(recorded, 0.99),
+        },
+    }
+
+
+def print_report(report: dict):
+    print("\nResults:")
+    print(f"Requests: {report['requests']} ({report['units']} HTTP calls)")
+    print(f"Total time: {report['total_time_s']:.2f}s")
+    print(f"Throughput: {report['throughput_req_s']:.2f} req/s")
+    print(f"Status: {report['status_counts']}")
+    for endpoint, latency in report["latency_s"].items():
+        print(
+            f"{endpoint:>12}: P50 {latency['p50']:.3f}s  P95 {latency['p95']:.3f}s  "
+            f"P99 {latency['p99']:.3f}s  (n={latency['count']})"
+        )
+    recorded = report["recorded_latency_s"]
+    print(f"{'recorded':>12}: P50 {recorded['p50']:.3f}s  P99 {recorded['p99']:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured gateway traffic")
+    parser.add_argument("trace", help="트래픽 캡처 JSONL 경로")
+    parser.add_argument("--gateway", default="http://127.0.0.1:8080")
+    parser.add_argument("--speed", type=float, default=1.0, help="재생 배속")
+    parser.add_argument("--limit", type=int, default=0, help="앞에서부터 N개만")
+    parser.add_argument(
+        "--no-exact-output",
+        action="store_true",
+        help="기록된 completion_tokens 대신 원래 max_tokens 사용",
+    )
+    parser.add_argument("--output", help="리포트 JSON 저장 경로")
+    args = parser.parse_args()
+
+    units = load_trace(args.trace, args.limit)
+    if not units:
+        print("❌ Empty trace")
+        return
+
+    results, total_time = asyncio.run(
+        replay(units, args.gateway, args.speed, not args.no_exact_output)
+    )
+    report = build_report(units, results, total_time)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Saved report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 import asyncio
+import time
 
 import pytest
 
-from src.models.schemas import ChatRequest, Message, MessageRole
-from src.services.batch_handler import BatchHandler
+from src.config import ModelBatchPolicy, settings
+from src.models.schemas import ChatRequest, ChatResponse, Message, MessageRole
+from src.services.batch_handler import REORDER_WINDOW_BATCHES, BatchHandler
+from src.services.length_predictor import LengthPrediction, OutputLengthPredictor
 from src.services.vllm_client import VLLMClient
 
 
@@ -51,3 +54,238 @@ async def test_batch_timeout(batch_handler):
     # 최소 타임아웃 시간은 지나야 함
     assert duration >= 0.1  # 100ms timeout
     assert response is not None
+
+
+class FakeVLLMClient:
+    """업스트림 호출 횟수를 기록하는 가짜 vLLM 클라이언트"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def chat_completion(self, request, request_id=None):
+        return (await self.chat_completion_n(request, n=1, request_id=request_id))[0]
+
+    async def chat_completion_n(self, request, n, request_id=None):
+        self.calls.append((request, n))
+        call_id = len(self.calls)
+        await asyncio.sleep(0.01)
+        return [
+            ChatResponse(
+                id=f"fake-{call_id}-{i}",
+                response=f"choice {i}",
+                model="fake",
+                usage={"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                latency_ms=10.0,
+            )
+            for i in range(n)
+        ]
+
+
+@pytest.mark.asyncio
+async def test_singleflight_deterministic_requests():
+    """temperature=0 동일 요청은 업스트림 호출 하나를 공유"""
+    client = FakeVLLMClient()
+    handler = BatchHandler(client)
+    request = ChatRequest(
+        messages=[Message(role=MessageRole.USER, content="Test")], temperature=0.0
+    )
+
+    responses = await asyncio.gather(*(handler.add_request(request) for _ in range(5)))
+
+    assert len(client.calls) == 1
+    assert {r.id for r in responses} == {responses[0].id}
+    stats = handler.get_stats()
+    assert stats["singleflight_hits"] == 4
+    assert stats["coalescing_ratio"] == pytest.approx(0.8)
+    assert stats["windows"]["1m"]["request_latency_ms"]["count"] == 5
+    assert stats["windows"]["1m"]["batch_size"]["max"] == 1
+
+
+@pytest.mark.asyncio
+async def test_singleflight_survives_leader_cancel():
+    """먼저 들어온 요청이 취소돼도 합류한 요청은 응답을 받음"""
+    client = FakeVLLMClient()
+    handler = BatchHandler(client)
+    request = ChatRequest(
+        messages=[Message(role=MessageRole.USER, content="Test")], temperature=0.0
+    )
+
+    leader = asyncio.create_task(handler.add_request(request))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(handler.add_request(request))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    response = await follower
+    assert response.id == "fake-1-0"
+    assert len(client.calls) == 1
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+@pytest.mark.asyncio
+async def test_sampling_requests_fan_out():
+    """배치 내 동일 샘플링 요청은 n=k 요청 하나로 병합"""
+    client = FakeVLLMClient()
+    handler = BatchHandler(client)
+    request = ChatRequest(
+        messages=[Message(role=MessageRole.USER, content="Test")], temperature=0.7
+    )
+    other = ChatRequest(
+        messages=[Message(role=MessageRole.USER, content="Other")], temperature=0.7
+    )
+
+    responses = await asyncio.gather(
+        *(handler.add_request(request) for _ in range(3)), handler.add_request(other)
+    )
+
+    assert sorted(n for _, n in client.calls) == [1, 3]
+    assert len({r.id for r in responses}) == 4
+    stats = handler.get_stats()
+    assert stats["upstream_requests"] == 2
+    assert stats["fanout_merged"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fan_out_with_missing_choices_fails_extra_requests():
+    """n을 무시하는 backend: 응답을 못 받은 요청은 대기하지 않고 에러"""
+
+    class IgnoresN(FakeVLLMClient):
+        async def chat_completion_n(self, request, n, request_id=None):
+            return await super().chat_completion_n(request, 1, request_id)
+
+    handler = BatchHandler(IgnoresN())
+    request = ChatRequest(
+        messages=[Message(role=MessageRole.USER, content="Test")], temperature=0.7
+    )
+
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            *(handler.add_request(request) for _ in range(3)), return_exceptions=True
+        ),
+        timeout=2,
+    )
+
+    assert sum(isinstance(r, ChatResponse) for r in results) == 1
+    assert sum(isinstance(r, RuntimeError) for r in results) == 2
+
+
+@pytest.mark.asyncio
+async def test_per_model_queues(monkeypatch):
+    """모델별 큐: 배치에 모델이 섞이지 않고 모델별 정책 적용"""
+    monkeypatch.setattr(
+        settings, "batch_model_policies", {"lora-a": ModelBatchPolicy(max_batch_size=2)}
+    )
+    client = FakeVLLMClient()
+    handler = BatchHandler(client)
+
+    def make(model, i):
+        return ChatRequest(
+            messages=[Message(role=MessageRole.USER, content=f"Test {i}")],
+            model=model,
+        )
+
+    await asyncio.gather(
+        *(handler.add_request(make("lora-a", i)) for i in range(4)),
+        *(handler.add_request(make(None, i)) for i in range(3)),
+    )
+
+    stats = handler.get_stats()
+    assert stats["total_requests"] == 7
+    assert stats["models"]["lora-a"]["total_batches"] == 2
+    assert stats["models"][settings.vllm_model]["total_batches"] == 1
+    assert stats["models"]["lora-a"]["windows"]["1m"]["batch_size"]["max"] == 2
+
+
+@pytest.mark.asyncio
+async def test_length_aware_batch_packing(monkeypatch):
+    """예상 길이 짧은 순으로 배치 구성, tail 합 예산 초과 시 다음 배치로"""
+    monkeypatch.setattr(settings, "batch_max_reorder_delay_ms", 60_000)
+    handler = BatchHandler(
+        FakeVLLMClient(),
+        length_predictor=OutputLengthPredictor(0.9, min_samples=1, max_keys=100),
+    )
+    mq = handler._model_queue("m")
+    mq.token_budget = 300
+
+    loop = asyncio.get_running_loop()
+    now = time.perf_counter()
+    for i, (expected, tail) in enumerate([(200, 256), (10, 16), (50, 64), (20, 32)]):
+        request = ChatRequest(messages=[Message(role=MessageRole.USER, content=str(i))])
+        prediction = LengthPrediction(expected=expected, tail=tail, samples=10)
+        mq.queue.append((request, loop.create_future(), now, prediction))
+
+    first = handler._take_batch(mq)
+    second = handler._take_batch(mq)
+
+    assert [e[0].messages[0].content for e in first] == ["1", "3", "2"]
+    assert [e[0].messages[0].content for e in second] == ["0"]
+
+
+@pytest.mark.asyncio
+async def test_length_aware_ordering_bounds_delay(monkeypatch):
+    """오래 기다린 요청은 예상 길이와 무관하게 먼저 처리"""
+    monkeypatch.setattr(settings, "batch_max_reorder_delay_ms", 100)
+    handler = BatchHandler(
+        FakeVLLMClient(),
+        length_predictor=OutputLengthPredictor(0.9, min_samples=1, max_keys=100),
+    )
+    mq = handler._model_queue("m")
+    mq.max_batch_size = 1
+
+    loop = asyncio.get_running_loop()
+    now = time.perf_counter()
+    for content, expected, enqueued_at in [("long", 500, now - 1), ("short", 5, now)]:
+        request = ChatRequest(
+            messages=[Message(role=MessageRole.USER, content=content)]
+        )
+        prediction = LengthPrediction(expected=expected, tail=expected, samples=10)
+        mq.queue.append((request, loop.create_future(), enqueued_at, prediction))
+
+    assert handler._take_batch(mq)[0][0].messages[0].content == "long"
+
+
+@pytest.mark.asyncio
+async def test_length_aware_reorder_window_is_bounded():
+    """재정렬은 큐 앞쪽 일부만 대상, 나머지 순서는 유지"""
+    handler = BatchHandler(
+        FakeVLLMClient(),
+        length_predictor=OutputLengthPredictor(0.9, min_samples=1, max_keys=100),
+    )
+    mq = handler._model_queue("m")
+    mq.max_batch_size = 2
+    window = mq.max_batch_size * REORDER_WINDOW_BATCHES
+
+    loop = asyncio.get_running_loop()
+    now = time.perf_counter()
+    for i in range(window + 10):
+        # 뒤쪽(window 밖) 요청일수록 짧음
+        request = ChatRequest(messages=[Message(role=MessageRole.USER, content=str(i))])
+        prediction = LengthPrediction(expected=1000 - i, tail=1000 - i, samples=10)
+        mq.queue.append((request, loop.create_future(), now, prediction))
+
+    batch = handler._take_batch(mq)
+
+    contents = [e[0].messages[0].content for e in batch]
+    assert contents == [str(window - 1), str(window - 2)]
+    remaining = [int(e[0].messages[0].content) for e in mq.queue]
+    assert remaining == [i for i in range(window + 10) if i < window - 2 or i >= window]
+
+
+@pytest.mark.asyncio
+async def test_add_request_reuses_given_prediction(monkeypatch):
+    """호출 측에서 계산한 예측이 있으면 다시 예측하지 않음"""
+    predictor = OutputLengthPredictor(0.9, min_samples=1, max_keys=100)
+    handler = BatchHandler(FakeVLLMClient(), length_predictor=predictor)
+    monkeypatch.setattr(settings, "batch_timeout_ms", 0)
+
+    def fail(*args):
+        raise AssertionError("predict called twice")
+
+    monkeypatch.setattr(predictor, "predict", fail)
+    request = ChatRequest(messages=[Message(role=MessageRole.USER, content="hi")])
+    prediction = LengthPrediction(expected=10, tail=16, samples=1)
+
+    response = await handler.add_request(request, "a", prediction)
+
+    assert response.id == "fake-1-0"
@@ -0,0 +1,119 @@
+import pytest
+
+from src.api.dependencies import settle_tokens
+from src.models.schemas import ChatRequest, ChatResponse, Message, MessageRole
+from src.services.cascade import CascadeRouter
+from src.services.length_predictor import OutputLengthPredictor
+from src.services.rate_limiter import TokenBucketRateLimiter
+
+
+class FakeSender:
+    """모델별 finish_reason을 지정할 수 있는 가짜 전송 함수"""
+
+    def __init__(self, truncated_models=()):
+        self.truncated_models = set(truncated_models)
+        self.models = []
+
+    async def __call__(self, request: ChatRequest) -> ChatResponse:
+        self.models.append(request.model)
+        return ChatResponse(
+            id=str(len(self.models)),
+            response="ok",
+            model=request.model,
+            usage={"prompt_tokens": 5, "completion_tokens": 20, "total_tokens": 25},
+            latency_ms=100.0 if request.model == "fast" else 1000.0,
+            finish_reason=(
+                "length" if request.model in self.truncated_models else "stop"
+            ),
+        )
+
+
+def make_request(content: str, max_tokens: int = 64, escalate: bool = False):
+    return ChatRequest(
+        messages=[Message(role=MessageRole.USER, content=content)],
+        max_tokens=max_tokens,
+        escalate=escalate,
+    )
+
+
+@pytest.fixture
+def router():
+    return CascadeRouter(fast_model="fast", quality_model="quality")
+
+
+def test_choose_route(router):
+    """짧고 단순한 요청만 fast"""
+    assert router.choose(make_request("Hi there")) == "fast"
+    assert router.choose(make_request("Hi there", max_tokens=1024)) == "quality"
+    assert router.choose(make_request("Write code for a parser")) == "quality"
+    assert router.choose(make_request("x" * 5000)) == "quality"
+    # 단어 단위 키워드 매칭
+    assert router.choose(make_request("Please improve this: decode")) == "fast"
+    assert router.choose(make_request("Prove it")) == "quality"
+    assert router.choose(make_request("이 코드를 고쳐줘")) == "quality"
+
+
+def test_choose_uses_predicted_length():
+    """예측기가 있으면 max_tokens 기본값(512)이어도 예상 출력 길이로 판단"""
+    predictor = OutputLengthPredictor(quantile=0.9, min_samples=5, max_keys=100)
+    router = CascadeRouter("fast", "quality", predictor)
+    request = make_request("Hi there", max_tokens=512)
+    assert router.choose(request, "a") == "quality"  # 학습 전: max_tokens
+
+    for _ in range(5):
+        predictor.observe(request, 40, "a")
+
+    assert router.choose(request, "a") == "fast"
+
+
+@pytest.mark.asyncio
+async def test_escalation_on_truncation(router):
+    """escalate 요청은 fast 응답이 잘리면 quality로 재시도"""
+    send = FakeSender(truncated_models={"fast"})
+
+    response = await router.run(make_request("Hi", escalate=True), send)
+
+    assert send.models == ["fast", "quality"]
+    assert response.model == "quality"
+    assert router.get_stats()["routes"]["escalated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_escalation_charges_both_generations(router):
+    """escalation 응답 usage는 fast + quality 합계 → rate limit도 둘 다 차감"""
+    limiter = TokenBucketRateLimiter(tokens_per_second=1e-3, burst_tokens=1000)
+    reservation = limiter.reserve("a", 64)
+
+    response = await router.run(
+        make_request("Hi", escalate=True), FakeSender(truncated_models={"fast"})
+    )
+    settle_tokens(limiter, reservation, [response])
+
+    assert response.usage == {
+        "prompt_tokens": 10,
+        "completion_tokens": 40,
+        "total_tokens": 50,
+    }
+    assert limiter.remaining("a") == 960
+
+
+@pytest.mark.asyncio
+async def test_history_routes_similar_prompts_to_quality(router):
+    """잘림이 반복된 유사 프롬프트는 quality로 직행"""
+    send = FakeSender(truncated_models={"fast"})
+    for _ in range(3):
+        await router.run(make_request("Tell me a story"), send)
+
+    assert router.choose(make_request("Tell me a story")) == "quality"
+
+
+@pytest.mark.asyncio
+async def test_gpu_seconds_saved(router):
+    """quality 토큰당 latency 기준 절약 시간 추정"""
+    send = FakeSender()
+    await router.run(make_request("Hi", max_tokens=512), send)  # quality
+    await router.run(make_request("Hi"), send)  # fast
+
+    stats = router.get_stats()
+    assert stats["routes"] == {"fast": 1, "quality": 1, "escalated": 0}
+    assert stats["gpu_seconds_saved"] == pytest.approx(0.9)
@@ -0,0 +1,168 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI
+
+from src.api.main import app
+from src.api.routes.chat_ws import ChatConnection
+from src.config import settings
+from src.models.schemas import ChatDelta, ChatRequest
+from src.services.batch_handler import BatchHandler
+from src.services.vllm_client import VLLMClient
+from tests.benchmarks.mock_vllm import create_app
+
+
+class StreamingFakeClient:
+    """프롬프트 내용을 한 글자씩 스트리밍 ("endless"면 끝없이 생성)"""
+
+    def __init__(self):
+        self.produced = 0
+        self.closed = 0
+
+    async def chat_completion_stream(self, request: ChatRequest):
+        content = request.messages[-1].content
+        try:
+            i = 0
+            while content == "endless" or i < len(content):
+                await asyncio.sleep(0.001)
+                self.produced += 1
+                yield ChatDelta(content=content[i % len(content)])
+                i += 1
+            yield ChatDelta(finish_reason="stop", usage={"completion_tokens": i})
+        finally:
+            self.closed += 1
+
+
+def chat_message(stream_id: str, content: str) -> dict:
+    return {
+        "type": "chat",
+        "id": stream_id,
+        "request": {"messages": [{"role": "user", "content": content}]},
+    }
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = StreamingFakeClient()
+    monkeypatch.setattr(app.state, "batch_handler", BatchHandler(client), raising=False)
+    return client
+
+
+def test_multiplexed_streams(fake_client):
+    """연결 하나에서 여러 스트림이 id별로 섞여 전달"""
+    with TestClient(app).websocket_connect("/api/v1/chat/ws") as ws:
+        ws.send_json(chat_message("a", "hello"))
+        ws.send_json(chat_message("b", "world!"))
+
+        text = {"a": "", "b": ""}
+        done = {}
+        while len(done) < 2:
+            message = ws.receive_json()
+            if message["type"] == "delta":
+                text[message["id"]] += message["content"]
+            elif message["type"] == "done":
+                done[message["id"]] = message
+
+    assert text == {"a": "hello", "b": "world!"}
+    assert done["b"]["usage"] == {"completion_tokens": 6}
+    assert done["a"]["finish_reason"] == "stop"
+    stats = app.state.batch_handler.get_stats()
+    assert stats["stream_requests"] == 2
+
+
+def test_cancel_aborts_upstream(fake_client):
+    """cancel 메시지로 생성 중단 및 upstream 스트림 종료"""
+    with TestClient(app).websocket_connect("/api/v1/chat/ws") as ws:
+        ws.send_json(chat_message("a", "endless"))
+        assert ws.receive_json()["type"] == "delta"
+
+        ws.send_json({"type": "cancel", "id": "a"})
+        message = ws.receive_json()
+        while message["type"] == "delta":
+            message = ws.receive_json()
+
+        assert message == {"type": "cancelled", "id": "a"}
+        assert fake_client.closed == 1
+
+
+def test_stream_limit_and_invalid_messages(fake_client, monkeypatch):
+    """연결당 스트림 상한 초과, 잘못된 메시지는 error로 응답"""
+    monkeypatch.setattr(settings, "websocket_max_streams", 1)
+    with TestClient(app).websocket_connect("/api/v1/chat/ws") as ws:
+        ws.send_json(chat_message("a", "endless"))
+        ws.send_json(chat_message("b", "hi"))
+        ws.send_json({"type": "chat", "id": "c", "request": {"messages": "x"}})
+        ws.send_text("not json")
+
+        errors = []
+        while len(errors) < 3:
+            message = ws.receive_json()
+            if message["type"] == "error":
+                errors.append(message)
+
+    assert [(e["id"], e["status"]) for e in errors] == [
+        ("b", 429),
+        ("c", 422),
+        (None, 400),
+    ]
+
+
+class BlockedWebSocket:
+    """전송이 막힌(느린 소비자) WebSocket"""
+
+    def __init__(self):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.unblock = asyncio.Event()
+
+    async def receive_text(self) -> str:
+        return await self.incoming.get()
+
+    async def send_json(self, message: dict) -> None:
+        await self.unblock.wait()
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_backpressure(monkeypatch):
+    """소비자가 느리면 전송 큐 크기 이상 생성하지 않음"""
+    monkeypatch.setattr(settings, "websocket_send_queue_size", 4)
+    client = StreamingFakeClient()
+    websocket = BlockedWebSocket()
+    connection = ChatConnection(websocket, BatchHandler(client), None, None, "key")
+
+    task = asyncio.create_task(connection.run())
+    await websocket.incoming.put(
+        '{"type": "chat", "id": "a", "request": '
+        '{"messages": [{"role": "user", "content": "endless"}]}}'
+    )
+    await asyncio.sleep(0.1)
+
+    # 큐 4개 + writer가 잡고 있는 1개 + put 대기 중인 1개
+    assert client.produced <= 6
+    assert connection.outbox.qsize() == 4
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert client.closed == 1
+
+
+@pytest.mark.asyncio
+async def test_vllm_client_stream(monkeypatch):
+    """OpenAI 스트리밍 chunk를 delta로 변환하고 마지막에 usage 전달"""
+    monkeypatch.setattr(settings, "vllm_api_key", "EMPTY")
+    client = VLLMClient()
+    transport = httpx.ASGITransport(app=create_app(ttft_ms=0, tpot_ms=0))
+    client.backends[client.base_urls[0]] = AsyncOpenAI(
+        base_url="http://mock/v1",
+        api_key="EMPTY",
+        http_client=httpx.AsyncClient(transport=transport),
+    )
+    request = ChatRequest(messages=[{"role": "user", "content": "hi"}], max_tokens=3)
+
+    deltas = [delta async for delta in client.chat_completion_stream(request)]
+
+    assert "".join(d.content for d in deltas) == "tok tok tok "
+    assert deltas[-1].finish_reason == "length"
+    assert deltas[-1].usage["completion_tokens"] == 3
@@ -0,0 +1,80 @@
+import json
+import threading
+
+import httpx
+import pytest
+from pydantic import ValidationError
+
+from src.api.main import app
+from src.api.routes.batch import _validate_batch
+from src.config import settings
+from src.services.cpu_offload import offload, shutdown_executor
+
+
+@pytest.mark.asyncio
+async def test_small_payload_runs_inline():
+    """임계값 미만은 이벤트 루프 스레드에서 실행"""
+    name = await offload("test", 10, lambda: threading.current_thread().name)
+    assert name == threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_large_payload_runs_in_worker():
+    """임계값 이상은 worker 스레드에서 실행"""
+    name = await offload(
+        "test", settings.offload_min_bytes, lambda: threading.current_thread().name
+    )
+    shutdown_executor()
+    assert name.startswith("cpu-offload")
+
+
+def test_validate_batch_itemwise():
+    """항목 단위 검증 결과가 전체 검증과 동일"""
+    body = json.dumps(
+        {
+            "requests": [
+                {"messages": [{"role": "user", "content": "hi"}]},
+                {"messages": [{"role": "user", "content": "yo"}], "max_tokens": 8},
+            ]
+        }
+    ).encode()
+    request = _validate_batch(body)
+    assert [r.messages[0].content for r in request.requests] == ["hi", "yo"]
+    assert request.requests[1].max_tokens == 8
+
+
+def test_validate_batch_reports_batch_loc():
+    """잘못된 항목은 배치 기준 위치로 보고"""
+    body = json.dumps(
+        {
+            "requests": [
+                {"messages": [{"role": "user", "content": "hi"}]},
+                {"max_tokens": 8},
+            ]
+        }
+    ).encode()
+    with pytest.raises(ValidationError) as exc_info:
+        _validate_batch(body)
+    assert exc_info.value.errors()[0]["loc"][:2] == ("requests", 1)
+
+
+@pytest.mark.asyncio
+async def test_parse_errors_are_client_errors():
+    """깨진 본문은 500이 아니라 FastAPI 기본 파싱과 같은 400/422"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        invalid_utf8 = await c.post(
+            "/api/v1/batch/chat",
+            content=b'{"requests": [{"messages": "\xff\xfe"}]}',
+            headers={"Content-Type": "application/json"},
+        )
+        invalid_json = await c.post(
+            "/api/v1/batch/chat",
+            content=b'{"requests": [',
+            headers={"Content-Type": "application/json"},
+        )
+
+    assert invalid_utf8.status_code == 400
+    assert invalid_utf8.json() == {"detail": "There was an error parsing the body"}
+    assert invalid_json.status_code == 422
+    assert invalid_json.json()["detail"][0]["type"] == "json_invalid"
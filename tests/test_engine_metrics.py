@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.services.engine_metrics import EngineMetricsCollector, parse_engine_metrics
+from tests.benchmarks.mock_vllm import create_app
+
+SAMPLE = b"""# HELP vllm:num_requests_running Number of running requests.
+# TYPE vllm:num_requests_running gauge
+vllm:num_requests_running{engine="0",model_name="phi-3"} 7.0
+vllm:num_requests_running{engine="1",model_name="phi-3"} 3.0
+vllm:num_requests_waiting{engine="0",model_name="phi-3"} 12.0
+vllm:gpu_cache_usage_perc{engine="0",model_name="phi-3"} 0.42
+vllm:kv_cache_usage_perc{engine="1",model_name="phi-3"} 0.97
+vllm:prompt_tokens_total{model_name="phi-3"} 123456.0
+process_cpu_seconds_total 1.5
+"""
+
+
+def test_parse_engine_metrics():
+    """running/waiting은 합산, KV cache는 최대값"""
+    load = parse_engine_metrics(SAMPLE)
+
+    assert load.running == 10.0
+    assert load.waiting == 12.0
+    assert load.kv_cache_usage == pytest.approx(0.97)
+    assert load.overloaded()
+
+
+@pytest.mark.asyncio
+async def test_collector_scrapes_mock_vllm():
+    """mock vLLM /metrics 수집 및 라우팅"""
+    app = create_app(ttft_ms=200, tpot_ms=0, max_num_seqs=2)
+    transport = httpx.ASGITransport(app=app)
+    collector = EngineMetricsCollector(["http://a", "http://b"], transport=transport)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://a") as client:
+        body = {"messages": [{"role": "user", "content": "hi"}], "max_tokens": 1}
+        tasks = [
+            asyncio.create_task(client.post("/v1/chat/completions", json=body))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0.05)
+        await collector.scrape_once()
+        await asyncio.gather(*tasks)
+
+    # 동일 앱이므로 두 backend 모두 같은 부하
+    load = collector.load("http://a")
+    assert load.running == 2.0
+    assert load.waiting == 1.0
+    assert load.kv_cache_usage == pytest.approx(1.0)
+    assert collector.should_throttle()
+    assert collector.least_loaded(["http://a", "http://b"], {"http://a": 5}) == (
+        "http://b"
+    )
+    await collector.stop()
+
+
+def test_no_throttle_without_fresh_metrics():
+    """수집된 부하 정보가 없으면 throttling 없음"""
+    collector = EngineMetricsCollector(["http://a"])
+
+    assert not collector.should_throttle()
+    assert collector.least_loaded(["http://a"]) is None
+
+
+def test_backend_without_metrics_still_routed():
+    """수집이 실패한 backend는 inflight 기준으로 계속 라우팅"""
+    collector = EngineMetricsCollector(["http://a", "http://b"])
+    collector._loads["http://a"] = parse_engine_metrics(
+        b"vllm:num_requests_running 4.0\n"
+    )
+    collector._loads["http://a"].scraped_at = time.monotonic()
+
+    urls = ["http://a", "http://b"]
+    assert collector.least_loaded(urls, {"http://a": 0, "http://b": 2}) == "http://b"
+    assert collector.least_loaded(urls, {"http://a": 0, "http://b": 5}) == "http://a"
+    assert not collector.should_throttle()
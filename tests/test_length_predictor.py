@@ -0,0 +1,76 @@
+import pytest
+
+from src.models.schemas import ChatRequest, Message, MessageRole
+from src.services.length_predictor import LengthHistogram, OutputLengthPredictor
+
+
+def make_request(system: str = "sys", content: str = "hi", max_tokens: int = 512):
+    return ChatRequest(
+        messages=[
+            Message(role=MessageRole.SYSTEM, content=system),
+            Message(role=MessageRole.USER, content=content),
+        ],
+        max_tokens=max_tokens,
+    )
+
+
+@pytest.fixture
+def predictor():
+    return OutputLengthPredictor(quantile=0.9, min_samples=5, max_keys=100)
+
+
+def test_histogram_quantile_is_bucket_upper_bound():
+    """분위수는 구간 상한 (보수적), 평균은 정확한 값"""
+    histogram = LengthHistogram()
+    for tokens in [10] * 9 + [300]:
+        histogram.add(tokens, max_samples=1000)
+
+    assert histogram.mean == pytest.approx(39.0)
+    assert histogram.quantile(0.5) == 11
+    assert histogram.quantile(0.95) == 362
+
+
+def test_no_data_falls_back_to_max_tokens(predictor):
+    """학습 전에는 max_tokens 그대로 (기존 동작)"""
+    prediction = predictor.predict(make_request(max_tokens=256))
+
+    assert (prediction.expected, prediction.tail, prediction.samples) == (256, 256, 0)
+
+
+def test_learns_per_feature_and_backs_off(predictor):
+    """feature별 학습, 샘플이 부족한 feature는 상위 단계로 backoff"""
+    for _ in range(10):
+        predictor.observe(make_request("summarize"), 40, tenant="a")
+        predictor.observe(make_request("write an essay"), 400, tenant="a")
+
+    assert predictor.predict(make_request("summarize"), "a").expected == 40
+    assert predictor.predict(make_request("write an essay"), "a").tail == 512
+    # 처음 보는 tenant / max_tokens → system 프롬프트 단계
+    backoff = predictor.predict(make_request("summarize", max_tokens=100), "b")
+    assert backoff.expected == 40
+    # 처음 보는 system 프롬프트 → 전체 단계, max_tokens로 clip
+    assert predictor.predict(make_request("new", max_tokens=64)).tail == 64
+
+
+def test_accuracy_stats(predictor):
+    """관측 직전 예측 기준 오차와 tail 커버리지"""
+    for _ in range(5):
+        predictor.observe(make_request(), 20)
+    predictor.observe(make_request(), 22)
+    predictor.observe(make_request(), 100)
+
+    stats = predictor.get_stats()
+    assert stats["observations"] == 7
+    assert stats["predicted"] == 2
+    assert stats["tail_coverage"] == pytest.approx(0.5)
+    assert stats["mean_abs_error_tokens"] > 0
+    assert stats["max_tokens_mean_abs_error_tokens"] > stats["mean_abs_error_tokens"]
+
+
+def test_key_count_is_bounded():
+    """feature key 수는 max_keys로 제한 (LRU)"""
+    predictor = OutputLengthPredictor(quantile=0.9, min_samples=1, max_keys=3)
+    for i in range(10):
+        predictor.observe(make_request(system=f"app {i}"), 10)
+
+    assert predictor.get_stats()["keys"] == 3
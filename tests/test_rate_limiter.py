@@ -0,0 +1,152 @@
+import httpx
+import pytest
+from fastapi.requests import HTTPConnection
+
+from src.api.dependencies import get_api_key
+from src.api.main import app
+from src.config import settings
+from src.services.rate_limiter import RateLimitExceeded, TokenBucketRateLimiter
+from tests.benchmarks.fake_client import FakeVLLMClient
+
+
+@pytest.fixture
+def limiter():
+    return TokenBucketRateLimiter(tokens_per_second=100.0, burst_tokens=1000)
+
+
+def test_reserve_and_reject(limiter):
+    """잔량 부족 시 429용 예외와 헤더"""
+    limiter.reserve("key", 800, now=0.0)
+
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        limiter.reserve("key", 512, now=0.0)
+
+    headers = exc_info.value.headers()
+    assert headers["X-RateLimit-Remaining"] == "200"
+    assert headers["Retry-After"] == "4"  # (512 - 200) / 100 tok/s
+
+
+def test_settle_refunds_unused_tokens(limiter):
+    """max_tokens 예약 후 실제 사용량만 차감"""
+    reservation = limiter.reserve("key", 512, now=0.0)
+    limiter.settle(reservation, used_tokens=20, now=0.0)
+
+    assert limiter.remaining("key", now=0.0) == 980
+
+
+def test_refill_over_time(limiter):
+    """경과 시간만큼 refill, burst 상한"""
+    limiter.reserve("key", 1000, now=0.0)
+
+    assert limiter.remaining("key", now=2.0) == 200
+    assert limiter.remaining("key", now=100.0) == 1000
+
+
+def test_keys_are_isolated(limiter):
+    """API 키별 독립 버킷"""
+    limiter.reserve("a", 1000, now=0.0)
+
+    limiter.reserve("b", 1000, now=0.0)
+    with pytest.raises(RateLimitExceeded):
+        limiter.reserve("a", 1, now=0.0)
+
+
+def test_request_larger_than_burst_allowed_when_full(limiter):
+    """burst보다 큰 요청은 버킷이 가득 찼을 때만 허용 (부채 발생)"""
+    limiter.reserve("key", 3000, now=0.0)
+
+    assert limiter.remaining("key", now=0.0) == 0
+    with pytest.raises(RateLimitExceeded):
+        limiter.reserve("key", 3000, now=15.0)
+    limiter.reserve("key", 3000, now=30.0)
+
+
+def test_settle_charges_overage(limiter):
+    """예측 기반 예약보다 더 쓰면 초과분 추가 차감"""
+    reservation = limiter.reserve("key", 100, now=0.0)
+    limiter.settle(reservation, used_tokens=300, now=0.0)
+
+    assert limiter.remaining("key", now=0.0) == 700
+
+
+def test_key_count_is_bounded():
+    """키를 계속 바꿔도 샤드당 키 수 상한 유지 (LRU)"""
+    limiter = TokenBucketRateLimiter(
+        tokens_per_second=100.0, burst_tokens=1000, num_shards=2, max_keys_per_shard=8
+    )
+    limiter.reserve("active", 1000, now=0.0)
+    for i in range(1000):
+        limiter.reserve(f"rotating-{i}", 1000, now=0.0)
+        limiter.remaining("active", now=0.0)
+
+    assert sum(len(shard) for shard in limiter._shards) <= 16
+    # 최근 사용한 키는 유지되어 잔량이 초기화되지 않음
+    assert limiter.remaining("active", now=0.0) == 0
+
+
+def make_connection(headers, host="10.0.0.1"):
+    return HTTPConnection(
+        {
+            "type": "http",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            "client": (host, 1234),
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_api_key_must_be_registered(monkeypatch):
+    """등록되지 않은 키는 클라이언트 IP로 제한 (헤더 교체로 우회 불가)"""
+    monkeypatch.setattr(settings, "rate_limit_api_keys", {"team-a"})
+
+    assert (
+        await get_api_key(make_connection({"Authorization": "Bearer team-a"}))
+        == "team-a"
+    )
+    assert await get_api_key(make_connection({"X-API-Key": "team-a"})) == "team-a"
+    assert (
+        await get_api_key(make_connection({"Authorization": "Bearer x1"})) == "10.0.0.1"
+    )
+    assert await get_api_key(make_connection({"X-API-Key": "x2"})) == "10.0.0.1"
+
+
+@pytest.mark.asyncio
+async def test_client_ip_header(monkeypatch):
+    """설정한 proxy 헤더로 클라이언트 구분, 없으면 연결 주소"""
+    monkeypatch.setattr(
+        settings, "rate_limit_client_ip_header", "x-envoy-external-address"
+    )
+
+    headers = {"x-envoy-external-address": "203.0.113.7"}
+    assert await get_api_key(make_connection(headers)) == "203.0.113.7"
+    assert await get_api_key(make_connection({})) == "10.0.0.1"
+
+
+@pytest.mark.asyncio
+async def test_route_returns_429_with_headers(monkeypatch):
+    """잔량 부족 시 429와 Retry-After / X-RateLimit-* 헤더"""
+    monkeypatch.setattr(settings, "rate_limit_api_keys", {"team-a"})
+    limiter = TokenBucketRateLimiter(tokens_per_second=10.0, burst_tokens=100)
+    for name, value in [
+        ("vllm_client", FakeVLLMClient()),
+        ("rate_limiter", limiter),
+        ("length_predictor", None),
+        ("cascade_router", None),
+        ("traffic_recorder", None),
+    ]:
+        monkeypatch.setattr(app.state, name, value, raising=False)
+
+    body = {"messages": [{"role": "user", "content": "hi"}], "max_tokens": 80}
+    headers = {"Authorization": "Bearer team-a"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        allowed = await c.post("/api/v1/chat", json=body, headers=headers)
+        limiter.reserve("team-a", limiter.remaining("team-a"))  # 잔량 소진
+        rejected = await c.post("/api/v1/chat", json=body, headers=headers)
+
+    assert allowed.status_code == 200
+    assert rejected.status_code == 429
+    assert rejected.headers["X-RateLimit-Limit"] == "100"
+    assert rejected.headers["X-RateLimit-Remaining"] == "0"
+    assert int(rejected.headers["Retry-After"]) == 8  # 80 tokens / 10 tok/s
+    assert rejected.headers["X-RateLimit-Reset"] == rejected.headers["Retry-After"]
@@ -0,0 +1,72 @@
+import httpx
+import pytest
+
+from src.api.main import app, warmup_until_ready
+from src.config import settings
+from src.services.vllm_client import VLLMClient
+
+
+class FlakyWarmupClient:
+    """처음 failures번은 warmup 실패"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.attempts = 0
+
+    async def warmup(self) -> bool:
+        self.attempts += 1
+        return self.attempts > self.failures
+
+
+async def get_ready() -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        return await c.get("/ready")
+
+
+@pytest.mark.asyncio
+async def test_ready_after_warmup_retries(monkeypatch):
+    """warmup 성공 전에는 503, 실패 시 재시도 후 200과 warmup_ms"""
+    monkeypatch.setattr(settings, "warmup_retry_interval_s", 0)
+    client = FlakyWarmupClient(failures=2)
+    monkeypatch.setattr(app.state, "vllm_client", client, raising=False)
+    monkeypatch.setattr(app.state, "ready", False, raising=False)
+    monkeypatch.setattr(app.state, "warmup_ms", None, raising=False)
+
+    response = await get_ready()
+    assert response.status_code == 503
+
+    await warmup_until_ready(app)
+
+    assert client.attempts == 3
+    response = await get_ready()
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert response.json()["warmup_ms"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_warmup_covers_every_model_backend(monkeypatch):
+    """cascade fast 모델의 별도 backend까지 모두 예열"""
+    monkeypatch.setattr(settings, "vllm_api_key", "EMPTY")
+    monkeypatch.setattr(settings, "vllm_base_url", "http://quality")
+    monkeypatch.setattr(settings, "vllm_extra_base_urls", "")
+    monkeypatch.setattr(settings, "served_models", "")
+    monkeypatch.setattr(settings, "cascade_enabled", True)
+    monkeypatch.setattr(settings, "cascade_fast_model", "fast")
+    monkeypatch.setattr(settings, "cascade_fast_base_urls", "http://fast")
+    monkeypatch.setattr(settings, "warmup_concurrency", 2)
+    client = VLLMClient()
+    calls = []
+
+    async def chat_completion(request, request_id=None, backend=None):
+        calls.append((request.model, backend))
+
+    monkeypatch.setattr(client, "chat_completion", chat_completion)
+
+    assert await client.warmup()
+    assert sorted(set(calls)) == [
+        ("fast", "http://fast"),
+        (settings.vllm_model, "http://quality"),
+    ]
+    assert len(calls) == 4
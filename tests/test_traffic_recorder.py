@@ -0,0 +1,151 @@
+import json
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+
+from src.models.schemas import ChatRequest, ChatResponse, Message, MessageRole
+from src.services.traffic_recorder import TrafficRecorder
+from tests.benchmarks import traffic_replay
+from tests.benchmarks.traffic_replay import build_request, send_unit
+
+
+@pytest.fixture
+def request_and_response():
+    request = ChatRequest(
+        messages=[Message(role=MessageRole.USER, content="secret prompt")],
+        max_tokens=64,
+        model="lora-a",
+    )
+    response = ChatResponse(
+        id="1",
+        response="ok",
+        model="fake",
+        usage={"prompt_tokens": 3, "completion_tokens": 12, "total_tokens": 15},
+        latency_ms=10.0,
+    )
+    return request, response
+
+
+def _record(tmp_path, mode, request, response, salt="salt"):
+    path = tmp_path / f"trace_{mode}_{salt}.jsonl"
+    recorder = TrafficRecorder(str(path), prompt_mode=mode, salt=salt)
+    recorder.record("api-key", "/chat", request, 1000.0, 42.0, "ok", response)
+    recorder.close()
+    return json.loads(path.read_text().strip())
+
+
+def test_hash_mode_hides_prompt_and_key(tmp_path, request_and_response):
+    """hash 모드: 원문과 API 키는 기록되지 않음"""
+    line = _record(tmp_path, "hash", *request_and_response)
+
+    assert "secret" not in json.dumps(line)
+    assert line["tenant"] != "api-key"
+    assert line["messages"][0]["chars"] == len("secret prompt")
+    assert line["completion_tokens"] == 12
+    assert line["max_tokens"] == 64
+    assert line["model"] == "lora-a"
+
+
+def test_hash_mode_digests_are_keyed(tmp_path, request_and_response):
+    """digest는 salt 키의 HMAC: 같은 salt끼리만 일치 (salt 없이 사전 대입 불가)"""
+    first = _record(tmp_path, "hash", *request_and_response)
+    (tmp_path / "again").mkdir()
+    again = _record(tmp_path / "again", "hash", *request_and_response)
+    other = _record(tmp_path, "hash", *request_and_response, salt="other")
+    unsalted = _record(tmp_path, "hash", *request_and_response, salt="")
+
+    assert first["tenant"] == again["tenant"]
+    assert first["messages"] == again["messages"]
+    for line in (other, unsalted):
+        assert line["tenant"] != first["tenant"]
+        assert line["messages"][0]["hmac"] != first["messages"][0]["hmac"]
+
+
+def test_redact_and_raw_modes(tmp_path, request_and_response):
+    """redact는 길이만, raw는 원문 기록"""
+    redacted = _record(tmp_path, "redact", *request_and_response)
+    assert set(redacted["messages"][0]) == {"role", "chars"}
+
+    raw = _record(tmp_path, "raw", *request_and_response)
+    assert raw["messages"][0]["content"] == "secret prompt"
+
+
+def test_replay_keeps_distinct_prompts_distinct():
+    """원문 없이 replay해도 다른 프롬프트는 다르게, 같은 프롬프트는 같게 재구성"""
+
+    def record(index, **message):
+        return {
+            "index": index,
+            "max_tokens": 8,
+            "messages": [{"role": "user", "chars": 40, **message}],
+        }
+
+    def content(record_):
+        return build_request(record_, exact_output=False)["messages"][0]["content"]
+
+    hashed = [
+        record(0, hmac="aaaa"),
+        record(1, hmac="bbbb"),
+        record(2, hmac="aaaa"),
+    ]
+    assert len({content(r) for r in hashed}) == 2
+    assert content(hashed[0]) == content(hashed[2])
+    assert len(content(hashed[0])) == 40
+
+    redacted = [record(i) for i in range(3)]
+    assert len({content(r) for r in redacted}) == 3
+    assert build_request({**hashed[0], "model": "lora-a"}, False)["model"] == "lora-a"
+
+
+class FakeSocket:
+    """미리 정한 서버 메시지를 돌려주는 WebSocket"""
+
+    def __init__(self, replies):
+        self.sent = []
+        self.replies = [json.dumps(r) for r in replies]
+
+    async def send(self, text: str) -> None:
+        self.sent.append(json.loads(text))
+
+    async def recv(self) -> str:
+        return self.replies.pop(0)
+
+
+@pytest.mark.asyncio
+async def test_replay_websocket_record(monkeypatch):
+    """/chat/ws 기록은 POST가 아니라 WebSocket 스트림으로 재전송"""
+    socket = FakeSocket(
+        [
+            {"type": "delta", "id": "r3", "content": "hi"},
+            {"type": "done", "id": "other"},
+            {"type": "done", "id": "r3", "finish_reason": "stop"},
+        ]
+    )
+    connects = []
+
+    @asynccontextmanager
+    async def connect(url, additional_headers):
+        connects.append((url, additional_headers))
+        yield socket
+
+    monkeypatch.setattr(traffic_replay.websockets, "connect", connect)
+    record = {
+        "index": 3,
+        "endpoint": "/chat/ws",
+        "tenant": "t1",
+        "max_tokens": 8,
+        "messages": [{"role": "user", "chars": 10}],
+    }
+
+    async with httpx.AsyncClient(base_url="http://gw:8080") as client:
+        result = await send_unit(client, {"records": [record]}, exact_output=False)
+
+    assert connects == [("ws://gw:8080/api/v1/chat/ws", {"X-API-Key": "t1"})]
+    assert socket.sent[0]["type"] == "chat"
+    assert socket.sent[0]["id"] == "r3"
+    assert socket.sent[0]["request"]["max_tokens"] == 8
+    assert result[:2] == ("/chat/ws", 200)
+
+    socket.replies = [json.dumps({"type": "error", "id": "r3", "status": 429})]
+    assert await traffic_replay.stream_chat(socket, record, False) == 429
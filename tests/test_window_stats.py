@@ -0,0 +1,70 @@
+import pytest
+
+from src.services.window_stats import (
+    TimeBucketedHistogram,
+    WindowedStats,
+    bin_index,
+    summarize,
+)
+
+
+def test_histogram_reuses_expired_buckets():
+    """구간 수는 고정, 오래된 구간은 재사용되어 윈도우에서 제외"""
+    histogram = TimeBucketedHistogram(bucket_seconds=10, max_window_seconds=60)
+    for t in range(0, 200, 5):
+        histogram.append(float(t), now=float(t))
+
+    windows = histogram.windows([("1m", 60)], now=195.0)
+    counts, peak = windows["1m"]
+    assert sum(counts.values()) == 12  # 140~195초
+    assert peak == 195.0
+
+
+def test_window_covers_full_time_span():
+    """요청률과 무관하게 윈도우 전체 시간 범위를 반영"""
+    stats = WindowedStats(("latency_ms",), bucket_seconds=10)
+    for i in range(90_000):  # 100 req/s, 15분
+        stats.record("latency_ms", 10.0, now=i / 100)
+
+    snapshot = stats.snapshot(now=899.99)
+
+    assert snapshot["1m"]["latency_ms"]["count"] == 6_000
+    assert snapshot["5m"]["latency_ms"]["count"] == 30_000
+    assert snapshot["15m"]["latency_ms"]["count"] == 90_000
+
+
+def test_summarize_percentiles():
+    """nearest-rank 백분위수 (구간 대표값, 상대 오차 약 1%)"""
+    counts = {}
+    for i in range(1, 101):
+        index = bin_index(float(i))
+        counts[index] = counts.get(index, 0) + 1
+
+    summary = summarize(counts, peak=100.0)
+
+    assert summary["count"] == 100
+    assert summary["p50"] == pytest.approx(50.0, rel=0.01)
+    assert summary["p99"] == pytest.approx(99.0, rel=0.01)
+    assert summary["max"] == 100.0
+    assert summarize({}, 0.0) == {
+        "count": 0,
+        "p50": 0.0,
+        "p90": 0.0,
+        "p99": 0.0,
+        "max": 0.0,
+    }
+
+
+def test_windowed_stats_snapshot():
+    """윈도우별 지표 요약"""
+    stats = WindowedStats(("latency_ms",), bucket_seconds=10)
+    stats.record("latency_ms", 10.0, now=0.0)
+    stats.record("latency_ms", 20.0, now=500.0)
+    stats.record("latency_ms", 0.0, now=505.0)
+
+    snapshot = stats.snapshot(now=510.0)
+
+    assert snapshot["1m"]["latency_ms"]["count"] == 2
+    assert snapshot["1m"]["latency_ms"]["p50"] == 0.0
+    assert snapshot["15m"]["latency_ms"]["count"] == 3
+    assert snapshot["15m"]["latency_ms"]["max"] == pytest.approx(20.0)